@@ -0,0 +1,25 @@
+"""Add composite indexes for payment and wallet ledger lookups.
+
+Revision ID: 0008_payment_composite_indexes
+Revises: 0007_wallet_balance
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0008_payment_composite_indexes"
+down_revision = "0007_wallet_balance"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_star_payments_user_status", "star_payments", ["user_id", "status"])
+    op.create_index("ix_wallet_ledger_user_created", "wallet_ledger", ["user_id", "created_at"])
+    op.create_index("ix_wallet_ledger_related_kind", "wallet_ledger", ["related_ledger_id", "kind"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_wallet_ledger_related_kind", table_name="wallet_ledger")
+    op.drop_index("ix_wallet_ledger_user_created", table_name="wallet_ledger")
+    op.drop_index("ix_star_payments_user_status", table_name="star_payments")
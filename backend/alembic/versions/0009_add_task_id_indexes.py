@@ -0,0 +1,23 @@
+"""Add indexes on premium task id columns.
+
+Revision ID: 0009_task_id_indexes
+Revises: 0008_payment_composite_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+
+revision = "0009_task_id_indexes"
+down_revision = "0008_payment_composite_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_star_payments_consumed_by_task_id", "star_payments", ["consumed_by_task_id"])
+    op.create_index("ix_wallet_ledger_task_id", "wallet_ledger", ["task_id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_wallet_ledger_task_id", table_name="wallet_ledger")
+    op.drop_index("ix_star_payments_consumed_by_task_id", table_name="star_payments")
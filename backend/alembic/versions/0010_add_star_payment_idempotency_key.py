@@ -0,0 +1,28 @@
+"""Add idempotency key to star payments.
+
+Revision ID: 0010_payment_idempotency_key
+Revises: 0009_task_id_indexes
+Create Date: 2026-10-17
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_payment_idempotency_key"
+down_revision = "0009_task_id_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("star_payments", sa.Column("idempotency_key", sa.String(length=64), nullable=True))
+    op.create_unique_constraint(
+        "uq_star_payments_user_idempotency_key",
+        "star_payments",
+        ["user_id", "idempotency_key"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_star_payments_user_idempotency_key", "star_payments", type_="unique")
+    op.drop_column("star_payments", "idempotency_key")
@@ -1,6 +1,8 @@
 from collections.abc import Generator
 
+import orjson
 from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import DeclarativeBase, Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -24,15 +26,46 @@ else:
     engine_kwargs["max_overflow"] = 20
     engine_kwargs["pool_timeout"] = 30
 
+def _json_serializer(value) -> str:
+    # JSON columns are bound as text on both PostgreSQL and SQLite.
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+
+
 engine = create_engine(
     settings.database_url,
     future=True,
     connect_args=connect_args,
+    json_serializer=_json_serializer,
+    json_deserializer=orjson.loads,
     **engine_kwargs,
 )
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
 
 
+_ON_CONFLICT_DIALECTS = frozenset({"postgresql", "sqlite"})
+
+
+def supports_on_conflict_inserts(db: Session) -> bool:
+    """Whether ``insert_ignoring_conflicts`` can build a statement for ``db``'s dialect."""
+    return db.get_bind().dialect.name in _ON_CONFLICT_DIALECTS
+
+
+def insert_ignoring_conflicts(db: Session, model, index_elements: tuple[str, ...]):
+    """INSERT ... ON CONFLICT DO NOTHING for the dialect bound to ``db``.
+
+    Callers check ``supports_on_conflict_inserts`` first and keep a generic
+    INSERT/IntegrityError path for other dialects.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        stmt = postgresql.insert(model)
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(model)
+    else:
+        raise NotImplementedError(f"ON CONFLICT inserts are not supported for dialect {dialect!r}")
+    return stmt.on_conflict_do_nothing(index_elements=list(index_elements))
+
+
 def get_db() -> Generator[Session, None, None]:
     db = SessionLocal()
     try:
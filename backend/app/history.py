@@ -18,40 +18,61 @@ def _utcnow_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-async def save_report_to_history(
-    redis: Any,
+def stage_report_to_history(
+    pipe: Any,
     tg_user_id: int,
     report_type: str,
     report_id: str,
     is_premium: bool,
     summary: dict,
 ) -> None:
-    """Persist a report summary to Redis with 14-day TTL.
+    """Queue the history writes on a Redis pipeline; the caller runs ``execute()``.
 
     Key schema:
         user_report:{tg_user_id}:{report_type}:{report_id}  →  JSON blob (SETEX 14d)
         user_history:{tg_user_id}  →  Sorted Set score=unix_ts member="{report_type}:{report_id}"
     """
+    blob = json.dumps(
+        {
+            "type": report_type,
+            "id": report_id,
+            "is_premium": is_premium,
+            "summary": summary,
+            "created_at": _utcnow_iso(),
+        },
+        ensure_ascii=False,
+    )
+    report_key = f"user_report:{tg_user_id}:{report_type}:{report_id}"
+    history_key = f"user_history:{tg_user_id}"
+    member = f"{report_type}:{report_id}"
+
+    pipe.setex(report_key, _REPORT_TTL, blob)
+    pipe.zadd(history_key, {member: time.time()})
+    pipe.expire(history_key, _INDEX_TTL)
+
+
+async def save_report_to_history(
+    redis: Any,
+    tg_user_id: int,
+    report_type: str,
+    report_id: str,
+    is_premium: bool,
+    summary: dict,
+) -> None:
+    """Persist a report summary to Redis with 14-day TTL in a single round trip."""
     if redis is None:
         return
     try:
-        blob = json.dumps(
-            {
-                "type": report_type,
-                "id": report_id,
-                "is_premium": is_premium,
-                "summary": summary,
-                "created_at": _utcnow_iso(),
-            },
-            ensure_ascii=False,
-        )
-        report_key = f"user_report:{tg_user_id}:{report_type}:{report_id}"
-        history_key = f"user_history:{tg_user_id}"
-        member = f"{report_type}:{report_id}"
-
-        await redis.setex(report_key, _REPORT_TTL, blob)
-        await redis.zadd(history_key, {member: time.time()})
-        await redis.expire(history_key, _INDEX_TTL)
+        async with redis.pipeline(transaction=False) as pipe:
+            stage_report_to_history(
+                pipe,
+                tg_user_id=tg_user_id,
+                report_type=report_type,
+                report_id=report_id,
+                is_premium=is_premium,
+                summary=summary,
+            )
+            await pipe.execute()
     except Exception:
         logger.exception("Failed to save report to history | tg_user_id=%s | type=%s", tg_user_id, report_type)
 
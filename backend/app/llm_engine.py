@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from functools import lru_cache
 import json
 import logging
 import re
@@ -86,12 +87,27 @@ TAROT_MAX_TOKENS_WITH_QUESTION_BASIC = 140
 TAROT_MAX_TOKENS_NO_QUESTION_BASIC = 90
 
 
-def llm_provider_label() -> str | None:
-    models = _openrouter_text_models()
+def _openrouter_model_setting() -> str:
+    return settings.openrouter_free_model or settings.openrouter_model or ""
+
+
+@lru_cache(maxsize=8)
+def _provider_label_for(raw_models: str) -> str:
+    models = _parse_model_chain(raw_models)
     model = models[0] if models else ""
     return f"openrouter:{model}" if model else "openrouter"
 
 
+def llm_provider_label() -> str | None:
+    # Cached per configured model string, so a settings change yields a new label.
+    return _provider_label_for(_openrouter_model_setting())
+
+
+def llm_text_enabled() -> bool:
+    """Whether a text LLM request could be attempted at all with the current settings."""
+    return bool(settings.openrouter_api_key) and bool(_openrouter_text_models())
+
+
 def _using_openrouter() -> bool:
     return settings.llm_provider.lower().strip() == "openrouter"
 
@@ -113,13 +129,18 @@ def _limit_lines(lines: list[str], limit: int, compact: bool) -> list[str]:
     return lines[:limit] if compact else lines
 
 
-def _openrouter_text_models() -> list[str]:
-    raw = (settings.openrouter_free_model or settings.openrouter_model or "").strip()
+@lru_cache(maxsize=8)
+def _parse_model_chain(raw_models: str) -> tuple[str, ...]:
+    raw = raw_models.strip()
     if not raw:
-        return []
+        return ()
     # Allow configuring fallback chain: "model-a:free,model-b:free,model-c:free"
     models = [part.strip() for part in raw.replace("\n", ",").split(",")]
-    return [m for m in models if m]
+    return tuple(m for m in models if m)
+
+
+def _openrouter_text_models() -> list[str]:
+    return list(_parse_model_chain(_openrouter_model_setting()))
 
 
 def _openrouter_headers() -> dict[str, str] | None:
@@ -7,7 +7,7 @@ from uuid import uuid4
 
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import Response
 
@@ -17,10 +17,12 @@ from slowapi import _rate_limit_exceeded_handler
 from slowapi.errors import RateLimitExceeded
 from slowapi.middleware import SlowAPIMiddleware
 
+from . import star_payments
 from .config import settings
 from .limiter import limiter
 from .localization import localize_json_bytes, normalize_target_language
 from .routers import forecast, health, natal, payments, tarot, telemetry, tasks as tasks_router, users
+from .tarot_engine import close_tarotapi_client
 try:
     from .routers import geo
 except ImportError:  # pragma: no cover
@@ -165,9 +167,16 @@ async def lifespan(app: FastAPI):
 
     if getattr(app.state, "arq_pool", None) is not None:
         await app.state.arq_pool.close()
+    await star_payments.close_telegram_client()
+    await close_tarotapi_client()
 
 
-app = FastAPI(title="AstroBot API", version="0.2.0", lifespan=lifespan)
+app = FastAPI(
+    title="AstroBot API",
+    version="0.2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 app.state.limiter = limiter
 app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
 
@@ -194,6 +203,7 @@ if settings.cors_origins():
             "X-Telegram-Init-Data",
             "X-Internal-Api-Key",
             "X-User-Language",
+            "Idempotency-Key",
         ],
     )
 
@@ -8,6 +8,7 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     JSON,
     String,
@@ -50,6 +51,10 @@ class User(Base):
 
 class StarPayment(Base):
     __tablename__ = "star_payments"
+    __table_args__ = (
+        Index("ix_star_payments_user_status", "user_id", "status"),
+        UniqueConstraint("user_id", "idempotency_key", name="uq_star_payments_user_idempotency_key"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[int] = mapped_column(INT64, ForeignKey("users.id"), nullable=False, index=True)
@@ -62,7 +67,8 @@ class StarPayment(Base):
     invoice_link: Mapped[str | None] = mapped_column(Text)
     telegram_payment_charge_id: Mapped[str | None] = mapped_column(String(255), unique=True)
     provider_payment_charge_id: Mapped[str | None] = mapped_column(String(255))
-    consumed_by_task_id: Mapped[str | None] = mapped_column(String(128))
+    consumed_by_task_id: Mapped[str | None] = mapped_column(String(128), index=True)
+    idempotency_key: Mapped[str | None] = mapped_column(String(64))
     meta_payload: Mapped[dict | None] = mapped_column(JSON)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
@@ -74,6 +80,10 @@ class StarPayment(Base):
 
 class WalletLedger(Base):
     __tablename__ = "wallet_ledger"
+    __table_args__ = (
+        Index("ix_wallet_ledger_user_created", "user_id", "created_at"),
+        Index("ix_wallet_ledger_related_kind", "related_ledger_id", "kind"),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     user_id: Mapped[int] = mapped_column(INT64, ForeignKey("users.id"), nullable=False, index=True)
@@ -94,7 +104,7 @@ class WalletLedger(Base):
         nullable=True,
         index=True,
     )
-    task_id: Mapped[str | None] = mapped_column(String(128))
+    task_id: Mapped[str | None] = mapped_column(String(128), index=True)
     meta_payload: Mapped[dict | None] = mapped_column(JSON)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
 
@@ -155,7 +165,7 @@ class TarotSession(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=utcnow, nullable=False)
 
     cards: Mapped[list["TarotCard"]] = relationship(
-        "TarotCard", back_populates="session", cascade="all, delete-orphan"
+        "TarotCard", back_populates="session", cascade="all, delete-orphan", order_by="TarotCard.position"
     )
 
 
@@ -1,4 +1,3 @@
-import json
 import logging
 from datetime import date
 
@@ -88,7 +87,7 @@ async def get_forecast_stories(
             focus=focus,
             natal_summary=natal_summary,
             key_aspects=aspects_list,
-            fallback_slides_json=json.dumps(static_fallback, ensure_ascii=False),
+            fallback_slides=static_fallback,
             llm_provider_label=llm_provider_label(),
             mbti_type=user.mbti_type,
         )
@@ -1,4 +1,3 @@
-import json
 import logging
 from uuid import UUID
 
@@ -80,7 +79,7 @@ def get_latest_profile(
     db: Session = Depends(get_db),
     user: models.User = Depends(current_user_dep),
 ):
-    profile = services.get_latest_birth_profile(db=db, user_id=user.id)
+    profile = services.get_latest_birth_profile_snapshot(db=db, user_id=user.id)
     return schemas.BirthProfileResponse(
         id=profile.id,
         birth_date=profile.birth_date,
@@ -212,7 +211,7 @@ async def get_full_natal(
             essential_dignities=list(material.get("dignity_lines") or []),
             configurations=list(material.get("configurations_lines") or []),
             full_aspects=list(material.get("full_aspect_lines") or []),
-            static_sections_json=json.dumps(static_sections, ensure_ascii=False),
+            static_sections=static_sections,
         )
         logger.info("Natal chart LLM enqueued | user_id=%s | job_id=%s", user.id, job.job_id)
         return JSONResponse({"status": "pending", "task_id": job.job_id})
@@ -69,8 +69,14 @@ async def create_stars_invoice(
     payload: schemas.StarsInvoiceCreateRequest,
     db: Session = Depends(get_db),
     user: models.User = Depends(current_user_dep),
+    idempotency_key: str | None = Header(default=None, alias="Idempotency-Key", max_length=128),
 ):
-    payment = await star_payments.create_invoice_for_user(db, user=user, feature=payload.feature)
+    payment = await star_payments.create_invoice_for_user(
+        db,
+        user=user,
+        feature=payload.feature,
+        idempotency_key=idempotency_key,
+    )
     logger.info(
         "Stars invoice created | tg_user_id=%s | payment_id=%s | feature=%s | amount=%s",
         user.tg_user_id,
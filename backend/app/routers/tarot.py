@@ -24,7 +24,7 @@ async def draw_tarot(
     db: Session = Depends(get_db),
     user: models.User = Depends(current_user_dep),
 ):
-    session = services.draw_tarot_reading(
+    session = await services.draw_tarot_reading(
         db=db,
         user_id=user.id,
         spread_type=payload.spread_type,
@@ -37,12 +37,12 @@ async def draw_tarot(
         cards_payload=cards_payload,
     )
     hide_cards = llm_provider == "local:fallback"
-    response_cards = [] if hide_cards else sorted(cards, key=lambda c: c.position)
+    response_cards = [] if hide_cards else cards
 
     redis = getattr(request.app.state, "arq_pool", None)
     cards_summary = [
         {"card_name": c.card_name, "is_reversed": c.is_reversed, "slot_label": c.slot_label}
-        for c in sorted(cards, key=lambda c: c.position)
+        for c in cards
     ]
     background_tasks.add_task(
         save_report_to_history,
@@ -58,6 +58,7 @@ async def draw_tarot(
         },
     )
 
+    provider = settings.tarot_provider
     return schemas.TarotSessionResponse(
         session_id=session.id,
         spread_type=session.spread_type,
@@ -73,7 +74,7 @@ async def draw_tarot(
                 is_reversed=card.is_reversed,
                 meaning=card.meaning,
                 image_url=card_image_url(card.card_name),
-                provider=settings.tarot_provider,
+                provider=provider,
             )
             for card in response_cards
         ],
@@ -98,7 +99,7 @@ async def draw_tarot_premium(
     if not settings.openrouter_api_key:
         raise HTTPException(status_code=503, detail="Премиум LLM не настроен")
 
-    session = services.draw_tarot_reading(
+    session = await services.draw_tarot_reading(
         db=db,
         user_id=user.id,
         spread_type=payload.spread_type,
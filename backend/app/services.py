@@ -1,20 +1,29 @@
-from datetime import date, datetime, timezone
+from collections.abc import Mapping
+from dataclasses import dataclass
+from datetime import date, datetime, time, timezone
+from functools import lru_cache
 import hashlib
+from itertools import islice
+from time import time_ns
 
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
-import json
 import logging
+from types import MappingProxyType
+import uuid
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
 from fastapi import HTTPException
+import orjson
 import redis
-from sqlalchemy.exc import IntegrityError, InvalidRequestError
+from sqlalchemy import Row, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session, joinedload
 
 from . import models
 from .config import settings
+from .database import insert_ignoring_conflicts, supports_on_conflict_inserts
 from .astro_engine import calculate_natal_chart
 from .llm_engine import (
     fallback_tarot_interpretation,
@@ -22,6 +31,7 @@ from .llm_engine import (
     interpret_natal_sections,
     interpret_tarot_reading,
     llm_provider_label,
+    llm_text_enabled,
 )
 from .tarot_engine import build_seed, card_image_url, draw_cards, supported_spreads
 
@@ -46,12 +56,23 @@ ASPECT_LABELS_RU = {
     "opposition": "оппозиция",
 }
 
+_EMPTY_MAPPING: Mapping = MappingProxyType({})
+
+_PLANET_ORDER = ("sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune", "pluto")
+
 TAROT_HIDDEN_MESSAGE = "Карты скрыли ответ.\nВозможно, время ещё не пришло."
 NATAL_LLM_CACHE_PREFIX = "natal:llm:v2"
 NATAL_LLM_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+BIRTH_PROFILE_CACHE_PREFIX = "birth:latest:v1"
+BIRTH_PROFILE_CACHE_TTL_SECONDS = 10 * 60
+REDIS_MAX_CONNECTIONS = 32
+# Wait this long for a free pooled connection, then treat the lookup as a cache miss.
+REDIS_POOL_TIMEOUT_SECONDS = 0.1
 STORY_DEFAULT_TIMING = "10:30-13:00 и 16:30-19:00"
+STORY_DEFAULT_FIRST_ASPECT = "Делайте ставку на последовательность и аккуратную коммуникацию."
 
 logger = logging.getLogger("astrobot.natal.llm_cache")
+birth_profile_logger = logging.getLogger("astrobot.birth_profile.cache")
 _redis_client: redis.Redis | None = None
 
 
@@ -164,13 +185,16 @@ def _get_redis_client() -> redis.Redis | None:
     if _redis_client is not None:
         return _redis_client
     try:
-        _redis_client = redis.Redis.from_url(
+        pool = redis.BlockingConnectionPool.from_url(
             settings.redis_url,
-            decode_responses=True,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT_SECONDS,
+            decode_responses=False,
             socket_connect_timeout=1.5,
             socket_timeout=1.5,
         )
-        _redis_client.ping()
+        # No eager ping: connections open lazily and callers already handle Redis errors.
+        _redis_client = redis.Redis(connection_pool=pool)
         return _redis_client
     except Exception as exc:
         logger.warning("Redis unavailable for natal LLM cache: %s", str(exc))
@@ -178,24 +202,35 @@ def _get_redis_client() -> redis.Redis | None:
         return None
 
 
+_LLM_SECTION_KEYS = (
+    "key_aspects",
+    "planetary_profile",
+    "house_cusps",
+    "mc_axis",
+    "lunar_nodes",
+    "house_rulers",
+    "dispositors",
+    "essential_dignities",
+    "configurations",
+    "natal_explanation",
+)
+
+
 def _normalize_llm_sections(payload: dict) -> dict[str, str]:
-    result: dict[str, str] = {}
-    for key in (
-        "key_aspects",
-        "planetary_profile",
-        "house_cusps",
-        "mc_axis",
-        "lunar_nodes",
-        "house_rulers",
-        "dispositors",
-        "essential_dignities",
-        "configurations",
-        "natal_explanation",
-    ):
-        value = payload.get(key)
-        if isinstance(value, str) and value.strip():
-            result[key] = value.strip()
-    return result
+    return {
+        key: stripped
+        for key in _LLM_SECTION_KEYS
+        if isinstance(value := payload.get(key), str) and (stripped := value.strip())
+    }
+
+
+@lru_cache(maxsize=1024)
+def _is_valid_timezone(timezone_name: str) -> bool:
+    try:
+        ZoneInfo(timezone_name)
+    except ZoneInfoNotFoundError:
+        return False
+    return True
 
 
 def create_birth_profile(
@@ -208,9 +243,7 @@ def create_birth_profile(
     longitude: float,
     timezone_name: str,
 ) -> models.BirthProfile:
-    try:
-        ZoneInfo(timezone_name)
-    except ZoneInfoNotFoundError:
+    if not _is_valid_timezone(timezone_name):
         raise HTTPException(status_code=422, detail="Invalid timezone")
 
     profile = models.BirthProfile(
@@ -225,9 +258,96 @@ def create_birth_profile(
     db.add(profile)
     db.commit()
     db.refresh(profile)
+    # The newest profile is the latest one, so the write path is the only cache filler.
+    _set_cached_birth_profile(profile)
     return profile
 
 
+@dataclass(frozen=True, slots=True)
+class BirthProfileSnapshot:
+    """Read-only copy of a birth profile, served from cache without touching the session."""
+
+    id: uuid.UUID
+    birth_date: date
+    birth_time: time
+    birth_place: str
+    latitude: float
+    longitude: float
+    timezone: str
+
+
+def _birth_profile_cache_key(user_id: int) -> str:
+    return f"{BIRTH_PROFILE_CACHE_PREFIX}:{user_id}"
+
+
+def _get_cached_birth_profile(user_id: int) -> BirthProfileSnapshot | None:
+    client = _get_redis_client()
+    if client is None:
+        return None
+
+    key = _birth_profile_cache_key(user_id)
+    try:
+        raw = client.get(key)
+    except Exception as exc:
+        birth_profile_logger.warning("Redis read failed for birth profile cache key=%s: %s", key, str(exc))
+        return None
+    if not raw:
+        return None
+
+    try:
+        data = orjson.loads(raw)
+        return BirthProfileSnapshot(
+            id=uuid.UUID(data["id"]),
+            birth_date=date.fromisoformat(data["birth_date"]),
+            birth_time=time.fromisoformat(data["birth_time"]),
+            birth_place=data["birth_place"],
+            latitude=float(data["latitude"]),
+            longitude=float(data["longitude"]),
+            timezone=data["timezone"],
+        )
+    except Exception as exc:
+        birth_profile_logger.warning("Invalid birth profile cache payload key=%s: %s", key, str(exc))
+        return None
+
+
+def _set_cached_birth_profile(profile: models.BirthProfile) -> None:
+    client = _get_redis_client()
+    if client is None:
+        return
+
+    key = _birth_profile_cache_key(profile.user_id)
+    try:
+        client.setex(
+            key,
+            BIRTH_PROFILE_CACHE_TTL_SECONDS,
+            orjson.dumps(
+                {
+                    "id": str(profile.id),
+                    "birth_date": profile.birth_date.isoformat(),
+                    "birth_time": profile.birth_time.isoformat(),
+                    "birth_place": profile.birth_place,
+                    "latitude": profile.latitude,
+                    "longitude": profile.longitude,
+                    "timezone": profile.timezone,
+                }
+            ),
+        )
+    except Exception as exc:
+        birth_profile_logger.warning("Redis write failed for birth profile cache key=%s: %s", key, str(exc))
+
+
+def _invalidate_cached_birth_profile(user_id: int) -> None:
+    client = _get_redis_client()
+    if client is None:
+        return
+
+    key = _birth_profile_cache_key(user_id)
+    try:
+        client.delete(key)
+    except Exception as exc:
+        birth_profile_logger.warning("Redis delete failed for birth profile cache key=%s: %s", key, str(exc))
+
+
 def get_latest_birth_profile(db: Session, user_id: int) -> models.BirthProfile:
     profile = (
         db.query(models.BirthProfile)
@@ -240,6 +360,25 @@ def get_latest_birth_profile(db: Session, user_id: int) -> models.BirthProfile:
     return profile
 
 
+def get_latest_birth_profile_snapshot(db: Session, user_id: int) -> BirthProfileSnapshot:
+    cached = _get_cached_birth_profile(user_id)
+    if cached is not None:
+        return cached
+
+    # A miss does not fill the cache: a reader could otherwise overwrite a newer profile
+    # written by create_birth_profile with the row it read before that commit.
+    profile = get_latest_birth_profile(db=db, user_id=user_id)
+    return BirthProfileSnapshot(
+        id=profile.id,
+        birth_date=profile.birth_date,
+        birth_time=profile.birth_time,
+        birth_place=profile.birth_place,
+        latitude=profile.latitude,
+        longitude=profile.longitude,
+        timezone=profile.timezone,
+    )
+
+
 def calculate_and_store_natal_chart(db: Session, user_id: int, profile_id) -> models.NatalChart:
     profile = (
         db.query(models.BirthProfile)
@@ -280,12 +419,22 @@ def get_latest_natal_chart(db: Session, user_id: int) -> models.NatalChart:
     return chart
 
 
+def _label_ru(labels: dict[str, str], raw) -> str:
+    # Engine output is already lowercase, so try the raw key before normalizing.
+    if type(raw) is str:
+        label = labels.get(raw)
+        if label is not None:
+            return label
+    text = str(raw)
+    return labels.get(text.lower(), text)
+
+
 def _format_natal_aspect(item: dict) -> str | None:
     if not isinstance(item, dict):
         return None
-    p1 = PLANET_LABELS_RU.get(str(item.get("planet_1", "")).lower(), str(item.get("planet_1", "")))
-    p2 = PLANET_LABELS_RU.get(str(item.get("planet_2", "")).lower(), str(item.get("planet_2", "")))
-    asp = ASPECT_LABELS_RU.get(str(item.get("aspect", "")).lower(), str(item.get("aspect", "")))
+    p1 = _label_ru(PLANET_LABELS_RU, item.get("planet_1", ""))
+    p2 = _label_ru(PLANET_LABELS_RU, item.get("planet_2", ""))
+    asp = _label_ru(ASPECT_LABELS_RU, item.get("aspect", ""))
     if not p1 or not p2 or not asp:
         return None
     orb = item.get("orb")
@@ -297,40 +446,32 @@ def _format_natal_aspect(item: dict) -> str | None:
         return f"{p1} - {p2}: {asp}"
 
 
-def _extract_natal_material(
-    *,
-    chart_payload: dict,
-    sun_sign: str,
-    moon_sign: str,
-    rising_sign: str,
-) -> dict[str, list[str] | str]:
-    interpretation = chart_payload.get("interpretation") if isinstance(chart_payload, dict) else {}
-    if not isinstance(interpretation, dict):
-        interpretation = {}
-
-    full_aspect_lines: list[str] = []
-    aspects = chart_payload.get("aspects") if isinstance(chart_payload, dict) else None
+def _extract_full_aspect_lines(aspects) -> list[str]:
+    lines: list[str] = []
     if isinstance(aspects, list):
         for item in aspects[:24]:
             formatted = _format_natal_aspect(item)
             if formatted:
-                full_aspect_lines.append(formatted)
+                lines.append(formatted)
+    return lines
 
-    key_aspects_lines: list[str] = []
-    raw_key_aspects = interpretation.get("key_aspects")
+
+def _extract_key_aspect_lines(raw_key_aspects, full_aspect_lines: list[str]) -> list[str]:
+    lines: list[str] = []
     if isinstance(raw_key_aspects, list):
         for item in raw_key_aspects[:8]:
             text = str(item).strip()
             if text:
-                key_aspects_lines.append(text)
-    if not key_aspects_lines and full_aspect_lines:
-        key_aspects_lines = full_aspect_lines[:5]
+                lines.append(text)
+    if not lines and full_aspect_lines:
+        lines = full_aspect_lines[:5]
+    return lines
+
 
-    planets = chart_payload.get("planets") if isinstance(chart_payload, dict) else {}
-    planetary_profile_lines: list[str] = []
+def _extract_planetary_profile_lines(planets) -> list[str]:
+    lines: list[str] = []
     if isinstance(planets, dict) and planets:
-        planet_order = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune", "pluto"]
-        for key in planet_order:
+        for key in _PLANET_ORDER:
             pdata = planets.get(key)
             if not isinstance(pdata, dict):
                 continue
@@ -340,151 +481,197 @@ def _extract_natal_material(
             retro_suffix = ", ретроградно" if retro else ""
             label = PLANET_LABELS_RU.get(key, key.capitalize())
             if lon is None:
-                planetary_profile_lines.append(f"{label}: {sign}{retro_suffix}")
+                lines.append(f"{label}: {sign}{retro_suffix}")
             else:
                 try:
-                    planetary_profile_lines.append(f"{label}: {sign}, {round(float(lon), 2)}°{retro_suffix}")
+                    lines.append(f"{label}: {sign}, {round(float(lon), 2)}°{retro_suffix}")
                 except (TypeError, ValueError):
-                    planetary_profile_lines.append(f"{label}: {sign}{retro_suffix}")
+                    lines.append(f"{label}: {sign}{retro_suffix}")
+    return lines
+
 
-    house_cusp_lines: list[str] = []
-    houses = chart_payload.get("houses") if isinstance(chart_payload, dict) else None
+def _extract_house_cusp_lines(houses) -> list[str]:
+    lines: list[str] = []
     if isinstance(houses, list):
         for idx, deg in enumerate(houses[:12], start=1):
             try:
-                house_cusp_lines.append(f"{idx} дом: {round(float(deg), 2)}°")
+                lines.append(f"{idx} дом: {round(float(deg), 2)}°")
             except (TypeError, ValueError):
                 continue
+    return lines
 
-    planets_in_houses_lines: list[str] = []
-    planets_in_houses = chart_payload.get("planets_in_houses") if isinstance(chart_payload, dict) else None
+
+def _extract_planets_in_houses_lines(planets_in_houses) -> list[str]:
+    lines: list[str] = []
     if isinstance(planets_in_houses, dict):
-        planet_order = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn", "uranus", "neptune", "pluto"]
-        for key in planet_order:
+        for key in _PLANET_ORDER:
             house_num = planets_in_houses.get(key)
             if house_num is None:
                 continue
             label = PLANET_LABELS_RU.get(key, key.capitalize())
-            planets_in_houses_lines.append(f"{label}: {house_num} дом")
-
-    mc_line = ""
-    mc = chart_payload.get("mc") if isinstance(chart_payload, dict) else None
-    if isinstance(mc, dict):
-        mc_sign = str(mc.get("sign") or "").strip()
-        mc_lon = mc.get("longitude")
-        if mc_sign:
-            if mc_lon is None:
-                mc_line = f"MC: {mc_sign}"
-            else:
-                try:
-                    mc_line = f"MC: {mc_sign}, {round(float(mc_lon), 2)}°"
-                except (TypeError, ValueError):
-                    mc_line = f"MC: {mc_sign}"
-
-    nodes_line = ""
-    nodes = chart_payload.get("nodes") if isinstance(chart_payload, dict) else None
-    if isinstance(nodes, dict):
-        north = nodes.get("north")
-        south = nodes.get("south")
-        if isinstance(north, dict) and isinstance(south, dict):
-            nsign = str(north.get("sign") or "").strip()
-            ssign = str(south.get("sign") or "").strip()
-            if nsign and ssign:
-                nodes_line = f"Северный узел: {nsign} | Южный узел: {ssign}"
-
-    house_rulers_lines: list[str] = []
-    house_rulers = chart_payload.get("house_rulers") if isinstance(chart_payload, dict) else None
-    if isinstance(house_rulers, list):
-        for item in house_rulers[:12]:
-            if not isinstance(item, dict):
+            lines.append(f"{label}: {house_num} дом")
+    return lines
+
+
+def _extract_mc_line(mc) -> str:
+    if not isinstance(mc, dict):
+        return ""
+    mc_sign = str(mc.get("sign") or "").strip()
+    if not mc_sign:
+        return ""
+    mc_lon = mc.get("longitude")
+    if mc_lon is None:
+        return f"MC: {mc_sign}"
+    try:
+        return f"MC: {mc_sign}, {round(float(mc_lon), 2)}°"
+    except (TypeError, ValueError):
+        return f"MC: {mc_sign}"
+
+
+def _extract_nodes_line(nodes) -> str:
+    if not isinstance(nodes, dict):
+        return ""
+    north = nodes.get("north")
+    south = nodes.get("south")
+    if not isinstance(north, dict) or not isinstance(south, dict):
+        return ""
+    nsign = str(north.get("sign") or "").strip()
+    ssign = str(south.get("sign") or "").strip()
+    if nsign and ssign:
+        return f"Северный узел: {nsign} | Южный узел: {ssign}"
+    return ""
+
+
+def _extract_house_rulers_lines(house_rulers) -> list[str]:
+    lines: list[str] = []
+    if not isinstance(house_rulers, list):
+        return lines
+    for item in house_rulers[:12]:
+        if not isinstance(item, dict):
+            continue
+        house_num = item.get("house")
+        cusp_sign = str(item.get("cusp_sign") or "").strip()
+        rulers = item.get("rulers")
+        if house_num is None or not cusp_sign or not isinstance(rulers, list) or not rulers:
+            continue
+
+        ruler_parts: list[str] = []
+        for ruler in rulers:
+            if not isinstance(ruler, dict):
                 continue
-            house_num = item.get("house")
-            cusp_sign = str(item.get("cusp_sign") or "").strip()
-            rulers = item.get("rulers")
-            if house_num is None or not cusp_sign or not isinstance(rulers, list) or not rulers:
+            planet_ru = str(ruler.get("planet_ru") or "").strip()
+            in_house = ruler.get("in_house")
+            in_sign = str(ruler.get("in_sign") or "").strip()
+            if not planet_ru:
                 continue
-
-            ruler_parts: list[str] = []
-            for ruler in rulers:
-                if not isinstance(ruler, dict):
-                    continue
-                planet_ru = str(ruler.get("planet_ru") or "").strip()
-                in_house = ruler.get("in_house")
-                in_sign = str(ruler.get("in_sign") or "").strip()
-                if not planet_ru:
-                    continue
-                if in_house is None:
-                    ruler_parts.append(f"{planet_ru} в {in_sign}")
-                else:
-                    ruler_parts.append(f"{planet_ru} в {in_house} доме ({in_sign})")
-            if ruler_parts:
-                house_rulers_lines.append(f"{house_num} дом ({cusp_sign}): " + ", ".join(ruler_parts))
-
-    dispositors_lines: list[str] = []
-    dispositors = chart_payload.get("dispositors") if isinstance(chart_payload, dict) else None
-    if isinstance(dispositors, list):
-        for item in dispositors[:10]:
+            if in_house is None:
+                ruler_parts.append(f"{planet_ru} в {in_sign}")
+            else:
+                ruler_parts.append(f"{planet_ru} в {in_house} доме ({in_sign})")
+        if ruler_parts:
+            lines.append(f"{house_num} дом ({cusp_sign}): " + ", ".join(ruler_parts))
+    return lines
+
+
+def _extract_dispositors_lines(dispositors) -> list[str]:
+    lines: list[str] = []
+    if not isinstance(dispositors, list):
+        return lines
+    for item in dispositors[:10]:
+        if not isinstance(item, dict):
+            continue
+        planet_ru = str(item.get("planet_ru") or "").strip()
+        primary = str(item.get("primary_dispositor_ru") or "").strip()
+        final = str(item.get("final_dispositor_ru") or "").strip()
+        is_cycle = bool(item.get("is_cycle"))
+        if not planet_ru:
+            continue
+        if is_cycle:
+            lines.append(f"{planet_ru}: цепочка диспозиторов замкнута")
+        elif primary and final:
+            lines.append(f"{planet_ru}: {primary} → финальный диспозитор {final}")
+        elif primary:
+            lines.append(f"{planet_ru}: диспозитор {primary}")
+    return lines
+
+
+def _extract_dignity_lines(essential_dignities) -> list[str]:
+    lines: list[str] = []
+    if not isinstance(essential_dignities, dict):
+        return lines
+    planets_dignities = essential_dignities.get("planets")
+    if isinstance(planets_dignities, list):
+        for item in planets_dignities[:10]:
             if not isinstance(item, dict):
                 continue
             planet_ru = str(item.get("planet_ru") or "").strip()
-            primary = str(item.get("primary_dispositor_ru") or "").strip()
-            final = str(item.get("final_dispositor_ru") or "").strip()
-            is_cycle = bool(item.get("is_cycle"))
+            score = item.get("score")
+            tags_ru = item.get("tags_ru")
             if not planet_ru:
                 continue
-            if is_cycle:
-                dispositors_lines.append(f"{planet_ru}: цепочка диспозиторов замкнута")
-            elif primary and final:
-                dispositors_lines.append(f"{planet_ru}: {primary} → финальный диспозитор {final}")
-            elif primary:
-                dispositors_lines.append(f"{planet_ru}: диспозитор {primary}")
-
-    dignity_lines: list[str] = []
-    essential_dignities = chart_payload.get("essential_dignities") if isinstance(chart_payload, dict) else None
-    if isinstance(essential_dignities, dict):
-        planets_dignities = essential_dignities.get("planets")
-        if isinstance(planets_dignities, list):
-            for item in planets_dignities[:10]:
-                if not isinstance(item, dict):
-                    continue
-                planet_ru = str(item.get("planet_ru") or "").strip()
-                score = item.get("score")
-                tags_ru = item.get("tags_ru")
-                if not planet_ru:
-                    continue
-                if isinstance(tags_ru, list) and tags_ru:
-                    tags_text = ", ".join(str(tag) for tag in tags_ru if str(tag).strip())
-                else:
-                    tags_text = "нейтрально"
-                dignity_lines.append(f"{planet_ru}: {tags_text} (балл {score})")
-        total_score = essential_dignities.get("total_score")
-        if total_score is not None:
-            dignity_lines.append(f"Суммарный индекс силы карты: {total_score}")
-
-    configurations_lines: list[str] = []
-    configurations = chart_payload.get("configurations") if isinstance(chart_payload, dict) else None
-    if isinstance(configurations, list):
-        for item in configurations[:8]:
-            if not isinstance(item, dict):
-                continue
-            ctype = str(item.get("type") or "").strip()
-            ctype_ru = str(item.get("type_ru") or ctype).strip()
-            members_ru = item.get("members_ru")
-            if isinstance(members_ru, list) and members_ru:
-                members_text = ", ".join(str(member) for member in members_ru if str(member).strip())
-            else:
-                members_text = ""
-            if ctype == "stellium_sign":
-                sign = str(item.get("sign") or "").strip()
-                configurations_lines.append(f"{ctype_ru} ({sign}): {members_text}")
-            elif ctype == "stellium_house":
-                house = item.get("house")
-                configurations_lines.append(f"{ctype_ru} ({house} дом): {members_text}")
-            elif ctype == "t_square":
-                apex_ru = str(item.get("apex_ru") or "").strip()
-                configurations_lines.append(f"{ctype_ru}: вершина {apex_ru}; участники {members_text}")
+            if isinstance(tags_ru, list) and tags_ru:
+                tags_text = ", ".join(str(tag) for tag in tags_ru if str(tag).strip())
             else:
-                configurations_lines.append(f"{ctype_ru}: {members_text}")
+                tags_text = "нейтрально"
+            lines.append(f"{planet_ru}: {tags_text} (балл {score})")
+    total_score = essential_dignities.get("total_score")
+    if total_score is not None:
+        lines.append(f"Суммарный индекс силы карты: {total_score}")
+    return lines
+
+
+def _extract_configurations_lines(configurations) -> list[str]:
+    lines: list[str] = []
+    if not isinstance(configurations, list):
+        return lines
+    for item in configurations[:8]:
+        if not isinstance(item, dict):
+            continue
+        ctype = str(item.get("type") or "").strip()
+        ctype_ru = str(item.get("type_ru") or ctype).strip()
+        members_ru = item.get("members_ru")
+        if isinstance(members_ru, list) and members_ru:
+            members_text = ", ".join(str(member) for member in members_ru if str(member).strip())
+        else:
+            members_text = ""
+        if ctype == "stellium_sign":
+            sign = str(item.get("sign") or "").strip()
+            lines.append(f"{ctype_ru} ({sign}): {members_text}")
+        elif ctype == "stellium_house":
+            house = item.get("house")
+            lines.append(f"{ctype_ru} ({house} дом): {members_text}")
+        elif ctype == "t_square":
+            apex_ru = str(item.get("apex_ru") or "").strip()
+            lines.append(f"{ctype_ru}: вершина {apex_ru}; участники {members_text}")
+        else:
+            lines.append(f"{ctype_ru}: {members_text}")
+    return lines
+
+
+def _extract_natal_material(
+    *,
+    chart_payload: dict,
+    sun_sign: str,
+    moon_sign: str,
+    rising_sign: str,
+) -> dict[str, list[str] | str]:
+    if not isinstance(chart_payload, dict):
+        chart_payload = {}
+    interpretation = chart_payload.get("interpretation")
+    if not isinstance(interpretation, dict):
+        interpretation = {}
+
+    full_aspect_lines = _extract_full_aspect_lines(chart_payload.get("aspects"))
+    key_aspects_lines = _extract_key_aspect_lines(interpretation.get("key_aspects"), full_aspect_lines)
+    planetary_profile_lines = _extract_planetary_profile_lines(chart_payload.get("planets"))
+    house_cusp_lines = _extract_house_cusp_lines(chart_payload.get("houses"))
+    planets_in_houses_lines = _extract_planets_in_houses_lines(chart_payload.get("planets_in_houses"))
+    mc_line = _extract_mc_line(chart_payload.get("mc"))
+    nodes_line = _extract_nodes_line(chart_payload.get("nodes"))
+    house_rulers_lines = _extract_house_rulers_lines(chart_payload.get("house_rulers"))
+    dispositors_lines = _extract_dispositors_lines(chart_payload.get("dispositors"))
+    dignity_lines = _extract_dignity_lines(chart_payload.get("essential_dignities"))
+    configurations_lines = _extract_configurations_lines(chart_payload.get("configurations"))
 
     natal_summary = str(interpretation.get("summary") or "").strip() or (
         f"Солнце в {sun_sign}, Луна в {moon_sign}, Асцендент в {rising_sign}."
@@ -531,8 +718,8 @@ def _natal_llm_cache_fingerprint(
         "provider": settings.llm_provider,
         "model": llm_provider_label() or "unknown",
     }
-    serialized = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
-    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+    # Same bytes as the previous compact, sorted json.dumps output, so existing cache keys stay valid.
+    return hashlib.sha256(orjson.dumps(payload, option=orjson.OPT_SORT_KEYS)).hexdigest()
 
 
 def _natal_llm_cache_key(user_id: int, fingerprint: str) -> str:
@@ -546,7 +733,11 @@ def _get_cached_natal_llm_sections(user_id: int, fingerprint: str) -> dict[str,
 
     key = _natal_llm_cache_key(user_id, fingerprint)
     try:
-        raw = client.get(key)
+        # Touch the TTL in the same round trip so hot entries stay cached.
+        with client.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.expire(key, NATAL_LLM_CACHE_TTL_SECONDS)
+            raw, _ = pipe.execute()
     except Exception as exc:
         logger.warning("Redis read failed for natal LLM cache key=%s: %s", key, str(exc))
         return None
@@ -555,7 +746,7 @@ def _get_cached_natal_llm_sections(user_id: int, fingerprint: str) -> dict[str,
         return None
 
     try:
-        payload = json.loads(raw)
+        payload = orjson.loads(raw)
     except Exception as exc:
         logger.warning("Invalid natal LLM cache payload key=%s: %s", key, str(exc))
         return None
@@ -570,12 +761,18 @@ def _get_cached_natal_llm_sections(user_id: int, fingerprint: str) -> dict[str,
     return normalized
 
 
-def _set_cached_natal_llm_sections(user_id: int, fingerprint: str, llm_sections: dict[str, str]) -> None:
+def _set_cached_natal_llm_sections(
+    user_id: int,
+    fingerprint: str,
+    llm_sections: dict[str, str],
+    *,
+    already_normalized: bool = False,
+) -> None:
     client = _get_redis_client()
     if client is None:
         return
 
-    normalized = _normalize_llm_sections(llm_sections)
+    normalized = llm_sections if already_normalized else _normalize_llm_sections(llm_sections)
     if not normalized:
         return
 
@@ -584,7 +781,7 @@ def _set_cached_natal_llm_sections(user_id: int, fingerprint: str, llm_sections:
         client.setex(
             key,
             NATAL_LLM_CACHE_TTL_SECONDS,
-            json.dumps(normalized, ensure_ascii=False, separators=(",", ":")),
+            orjson.dumps(normalized),
         )
         logger.info("Natal LLM cache store | user_id=%s | fingerprint=%s", user_id, fingerprint[:12])
     except Exception as exc:
@@ -624,133 +821,51 @@ def _build_natal_sections(
     configurations_lines = list(material.get("configurations_lines") or [])
     natal_summary = str(material.get("natal_summary") or "")
 
-    if key_aspects_lines:
-        key_aspects_fallback = (
-            "Ключевые связки карты: "
-            f"{' • '.join(key_aspects_lines[:4])}. "
-            "Практика: усиливайте решения через последовательность и фиксируйте результат письменно."
-        )
-    else:
-        key_aspects_fallback = (
-            "Ключевые аспекты не выделены автоматически. "
-            "Ориентир на день: один приоритет, один измеримый шаг, минимум переключений."
-        )
-
-    if planetary_profile_lines:
-        planetary_profile_fallback = (
-            "Планетный профиль: "
-            f"{' | '.join(planetary_profile_lines[:6])}. "
-            "Что усилить: регулярный ритм действий. Чего избегать: спонтанных решений на эмоциях."
-        )
-    else:
-        planetary_profile_fallback = (
-            "Планетный профиль временно недоступен. "
-            "Используйте базовый режим: сначала план, затем действие, затем короткая проверка результата."
-        )
-
-    if house_cusp_lines:
-        house_cusps_fallback = (
-            "Куспиды домов: "
-            f"{' • '.join(house_cusp_lines[:6])}. "
-            "Практика: распределяйте энергию по сферам жизни, не перегружая один сектор."
-        )
-    else:
-        house_cusps_fallback = (
-            "Куспиды домов временно недоступны. "
-            "Рекомендация: держите баланс между работой, отношениями и восстановлением ресурса."
-        )
-
-    if mc_line:
-        mc_axis_fallback = (
-            f"{mc_line}. "
-            "Практика: карьерные решения сверяйте с долгосрочной целью, а не только с быстрым результатом."
-        )
-    else:
-        mc_axis_fallback = (
-            "MC пока не определён в расчёте. "
-            "Рекомендация: опишите профессиональную цель на 3-6 месяцев и привяжите к ней текущие действия."
-        )
-
-    if nodes_line:
-        lunar_nodes_fallback = (
-            f"{nodes_line}. "
-            "Ориентир: меньше повторять старые сценарии и больше выбирать новые, но посильные шаги роста."
-        )
-    else:
-        lunar_nodes_fallback = (
-            "Лунные узлы пока не определены. "
-            "Практика: отслеживайте повторяющиеся паттерны и заменяйте их конкретной новой стратегией."
-        )
-
-    if house_rulers_lines:
-        house_rulers_fallback = (
-            "Управители домов: "
-            f"{' • '.join(house_rulers_lines[:6])}. "
-            "Используйте эти связи, чтобы понимать, как одно решение влияет на соседние сферы жизни."
-        )
-    else:
-        house_rulers_fallback = (
-            "Управители домов пока не рассчитаны. "
-            "Рекомендация: оценивайте каждую цель через влияние на работу, отношения и ресурс."
-        )
-
-    if dispositors_lines:
-        dispositors_fallback = (
-            "Цепочки диспозиторов: "
-            f"{' • '.join(dispositors_lines[:6])}. "
-            "Практика: отслеживайте финальный диспозитор как опорный стиль принятия решений."
-        )
-    else:
-        dispositors_fallback = (
-            "Диспозиторы пока не рассчитаны. "
-            "Практика: ищите, какие планеты повторяются как связующие между ключевыми темами карты."
-        )
-
-    if dignity_lines:
-        essential_dignities_fallback = (
-            "Эссенциальные достоинства: "
-            f"{' • '.join(dignity_lines[:6])}. "
-            "Чем выше балл планеты, тем проще проявлять ее качества экологично и стабильно."
-        )
-    else:
-        essential_dignities_fallback = (
-            "Эссенциальные достоинства пока не определены. "
-            "Практика: опирайтесь на те качества, которые проявляются без внутреннего сопротивления."
-        )
-
-    if configurations_lines:
-        configurations_fallback = (
-            "Конфигурации карты: "
-            f"{' • '.join(configurations_lines[:6])}. "
-            "Эти фигуры показывают зоны концентрации, напряжения и естественных точек роста."
-        )
-    else:
-        configurations_fallback = (
-            "Явные конфигурации (T-квадрат, стеллиум, большой тригон) не выделены. "
-            "Практика: опирайтесь на аспекты с минимальным орбом как на главный приоритет анализа."
-        )
-
-    natal_explanation_fallback = (
-        natal_summary
-        if natal_summary
-        else "Натальная карта сформирована. Главный ориентир: опирайтесь на сильные качества, "
-        "выбирайте конкретные цели и корректируйте курс по фактическому результату."
-    )
-
+    # Fallback texts sit behind ``or`` so they are only built for sections the LLM left empty.
     return [
         {
             "title": "Ключевые аспекты",
-            "text": str(llm_sections.get("key_aspects") or key_aspects_fallback),
+            "text": str(
+                llm_sections.get("key_aspects")
+                or (
+                    "Ключевые связки карты: "
+                    f"{' • '.join(key_aspects_lines[:4])}. "
+                    "Практика: усиливайте решения через последовательность и фиксируйте результат письменно."
+                    if key_aspects_lines
+                    else "Ключевые аспекты не выделены автоматически. "
+                    "Ориентир на день: один приоритет, один измеримый шаг, минимум переключений."
+                )
+            ),
             "icon": "🔭",
         },
         {
             "title": "Планетный профиль",
-            "text": str(llm_sections.get("planetary_profile") or planetary_profile_fallback),
+            "text": str(
+                llm_sections.get("planetary_profile")
+                or (
+                    "Планетный профиль: "
+                    f"{' | '.join(planetary_profile_lines[:6])}. "
+                    "Что усилить: регулярный ритм действий. Чего избегать: спонтанных решений на эмоциях."
+                    if planetary_profile_lines
+                    else "Планетный профиль временно недоступен. "
+                    "Используйте базовый режим: сначала план, затем действие, затем короткая проверка результата."
+                )
+            ),
             "icon": "🪐",
         },
         {
             "title": "Куспиды домов",
-            "text": str(llm_sections.get("house_cusps") or house_cusps_fallback),
+            "text": str(
+                llm_sections.get("house_cusps")
+                or (
+                    "Куспиды домов: "
+                    f"{' • '.join(house_cusp_lines[:6])}. "
+                    "Практика: распределяйте энергию по сферам жизни, не перегружая один сектор."
+                    if house_cusp_lines
+                    else "Куспиды домов временно недоступны. "
+                    "Рекомендация: держите баланс между работой, отношениями и восстановлением ресурса."
+                )
+            ),
             "icon": "🏛️",
         },
         {
@@ -766,43 +881,106 @@ def _build_natal_sections(
         },
         {
             "title": "MC и социальная реализация",
-            "text": str(llm_sections.get("mc_axis") or mc_axis_fallback),
+            "text": str(
+                llm_sections.get("mc_axis")
+                or (
+                    f"{mc_line}. "
+                    "Практика: карьерные решения сверяйте с долгосрочной целью, а не только с быстрым результатом."
+                    if mc_line
+                    else "MC пока не определён в расчёте. "
+                    "Рекомендация: опишите профессиональную цель на 3-6 месяцев и привяжите к ней текущие действия."
+                )
+            ),
             "icon": "🏔️",
         },
         {
             "title": "Лунные узлы",
-            "text": str(llm_sections.get("lunar_nodes") or lunar_nodes_fallback),
+            "text": str(
+                llm_sections.get("lunar_nodes")
+                or (
+                    f"{nodes_line}. "
+                    "Ориентир: меньше повторять старые сценарии и больше выбирать новые, но посильные шаги роста."
+                    if nodes_line
+                    else "Лунные узлы пока не определены. "
+                    "Практика: отслеживайте повторяющиеся паттерны и заменяйте их конкретной новой стратегией."
+                )
+            ),
             "icon": "☊",
         },
         {
             "title": "Управители домов",
-            "text": str(llm_sections.get("house_rulers") or house_rulers_fallback),
+            "text": str(
+                llm_sections.get("house_rulers")
+                or (
+                    "Управители домов: "
+                    f"{' • '.join(house_rulers_lines[:6])}. "
+                    "Используйте эти связи, чтобы понимать, как одно решение влияет на соседние сферы жизни."
+                    if house_rulers_lines
+                    else "Управители домов пока не рассчитаны. "
+                    "Рекомендация: оценивайте каждую цель через влияние на работу, отношения и ресурс."
+                )
+            ),
             "icon": "🗝️",
         },
         {
             "title": "Диспозиторы",
-            "text": str(llm_sections.get("dispositors") or dispositors_fallback),
+            "text": str(
+                llm_sections.get("dispositors")
+                or (
+                    "Цепочки диспозиторов: "
+                    f"{' • '.join(dispositors_lines[:6])}. "
+                    "Практика: отслеживайте финальный диспозитор как опорный стиль принятия решений."
+                    if dispositors_lines
+                    else "Диспозиторы пока не рассчитаны. "
+                    "Практика: ищите, какие планеты повторяются как связующие между ключевыми темами карты."
+                )
+            ),
             "icon": "🧬",
         },
         {
             "title": "Эссенциальные достоинства",
-            "text": str(llm_sections.get("essential_dignities") or essential_dignities_fallback),
+            "text": str(
+                llm_sections.get("essential_dignities")
+                or (
+                    "Эссенциальные достоинства: "
+                    f"{' • '.join(dignity_lines[:6])}. "
+                    "Чем выше балл планеты, тем проще проявлять ее качества экологично и стабильно."
+                    if dignity_lines
+                    else "Эссенциальные достоинства пока не определены. "
+                    "Практика: опирайтесь на те качества, которые проявляются без внутреннего сопротивления."
+                )
+            ),
             "icon": "⚖️",
         },
         {
             "title": "Конфигурации карты",
-            "text": str(llm_sections.get("configurations") or configurations_fallback),
+            "text": str(
+                llm_sections.get("configurations")
+                or (
+                    "Конфигурации карты: "
+                    f"{' • '.join(configurations_lines[:6])}. "
+                    "Эти фигуры показывают зоны концентрации, напряжения и естественных точек роста."
+                    if configurations_lines
+                    else "Явные конфигурации (T-квадрат, стеллиум, большой тригон) не выделены. "
+                    "Практика: опирайтесь на аспекты с минимальным орбом как на главный приоритет анализа."
+                )
+            ),
             "icon": "🕸️",
         },
         {
             "title": "Объяснение твоей натальной карты",
-            "text": str(llm_sections.get("natal_explanation") or natal_explanation_fallback),
+            "text": str(
+                llm_sections.get("natal_explanation")
+                or natal_summary
+                or "Натальная карта сформирована. Главный ориентир: опирайтесь на сильные качества, "
+                "выбирайте конкретные цели и корректируйте курс по фактическому результату."
+            ),
             "icon": "🔮",
         },
     ]
 
 
-def _natal_sections_from_payload(chart: models.NatalChart, user_id: int) -> list[dict]:
+def _natal_sections_from_payload(chart: models.NatalChart | Row, user_id: int) -> list[dict]:
     chart_payload = chart.chart_payload if isinstance(chart.chart_payload, dict) else {}
 
     material = _extract_natal_material(
@@ -839,13 +1017,41 @@ def _natal_sections_from_payload(chart: models.NatalChart, user_id: int) -> list
         )
         llm_sections = _normalize_llm_sections(generated or {})
         if llm_sections:
-            _set_cached_natal_llm_sections(user_id=user_id, fingerprint=fingerprint, llm_sections=llm_sections)
+            _set_cached_natal_llm_sections(
+                user_id=user_id,
+                fingerprint=fingerprint,
+                llm_sections=llm_sections,
+                already_normalized=True,
+            )
 
     return _build_natal_sections(material=material, llm_sections=llm_sections)
 
 
-def get_full_natal_chart(db: Session, user_id: int) -> tuple[models.NatalChart, list[dict], str | None]:
-    chart = get_latest_natal_chart(db=db, user_id=user_id)
+def _get_latest_natal_chart_row(db: Session, user_id: int) -> Row:
+    # Read-only path: plain column rows skip identity-map and instrumentation overhead.
+    stmt = (
+        select(
+            models.NatalChart.id,
+            models.NatalChart.profile_id,
+            models.NatalChart.sun_sign,
+            models.NatalChart.moon_sign,
+            models.NatalChart.rising_sign,
+            models.NatalChart.chart_payload,
+            models.NatalChart.created_at,
+        )
+        .join(models.BirthProfile, models.BirthProfile.id == models.NatalChart.profile_id)
+        .where(models.BirthProfile.user_id == user_id)
+        .order_by(models.NatalChart.created_at.desc())
+        .limit(1)
+    )
+    chart = db.execute(stmt).first()
+    if chart is None:
+        raise HTTPException(status_code=404, detail="Natal chart not found")
+    return chart
+
+
+def get_full_natal_chart(db: Session, user_id: int) -> tuple[Row, list[dict], str | None]:
+    chart = _get_latest_natal_chart_row(db=db, user_id=user_id)
     sections = _natal_sections_from_payload(chart=chart, user_id=user_id)
     wheel_chart_url = None
     payload = chart.chart_payload if isinstance(chart.chart_payload, dict) else {}
@@ -905,6 +1111,7 @@ def delete_user_profile_data(db: Session, user_id: int) -> dict[str, int | bool]
         raise
 
     _purge_user_natal_cache(user_id=user_id)
+    _invalidate_cached_birth_profile(user_id)
 
     return {
         "deleted_user": bool(deleted_users),
@@ -916,16 +1123,26 @@ def delete_user_profile_data(db: Session, user_id: int) -> dict[str, int | bool]
     }
 
 
-def _build_daily_summary(sun_sign: str, moon_sign: str, rising_sign: str, day_seed: int) -> tuple[int, str, dict]:
+_DAILY_MOODS = ("баланс", "прорыв", "рефлексия", "инициатива", "забота")
+_DAILY_FOCI = ("отношениях", "карьере", "финансах", "здоровье", "обучении")
+
+
+def _daily_summary_text(sun_sign: str, moon_sign: str, rising_sign: str, day_seed: int) -> tuple[int, str, str, str]:
     energy_score = 45 + (day_seed % 55)
-    mood = ["баланс", "прорыв", "рефлексия", "инициатива", "забота"][day_seed % 5]
-    focus = ["отношениях", "карьере", "финансах", "здоровье", "обучении"][day_seed % 5]
+    mood = _DAILY_MOODS[day_seed % 5]
+    focus = _DAILY_FOCI[day_seed % 5]
 
     summary = (
         f"Сегодня акцент на {focus}: энергия {energy_score}/100. "
         f"Солнечный знак {sun_sign}, Луна в {moon_sign}, Асцендент {rising_sign}. "
         f"Режим дня: {mood}."
     )
+    return energy_score, summary, mood, focus
+
+
+def _build_daily_summary(sun_sign: str, moon_sign: str, rising_sign: str, day_seed: int) -> tuple[int, str, dict]:
+    energy_score, summary, mood, focus = _daily_summary_text(sun_sign, moon_sign, rising_sign, day_seed)
+    # Fresh dict per call: the payload is handed to the ORM and must not be shared.
     payload = {
         "sun_sign": sun_sign,
         "moon_sign": moon_sign,
@@ -936,12 +1153,16 @@ def _build_daily_summary(sun_sign: str, moon_sign: str, rising_sign: str, day_se
     return energy_score, summary, payload
 
 
-def get_or_create_daily_forecast(db: Session, user_id: int, forecast_date: date) -> models.DailyForecast:
-    existing = (
+def _find_daily_forecast(db: Session, user_id: int, forecast_date: date) -> models.DailyForecast | None:
+    return (
         db.query(models.DailyForecast)
         .filter(models.DailyForecast.user_id == user_id, models.DailyForecast.forecast_date == forecast_date)
         .first()
     )
+
+
+def get_or_create_daily_forecast(db: Session, user_id: int, forecast_date: date) -> models.DailyForecast:
+    existing = _find_daily_forecast(db, user_id, forecast_date)
     if existing:
         return existing
 
@@ -953,98 +1174,111 @@ def get_or_create_daily_forecast(db: Session, user_id: int, forecast_date: date)
         rising_sign=chart.rising_sign,
         day_seed=day_seed,
     )
+    values = {
+        "user_id": user_id,
+        "forecast_date": forecast_date,
+        "energy_score": energy_score,
+        "summary": summary,
+        "payload": payload,
+    }
 
-    forecast = models.DailyForecast(
-        user_id=user_id,
-        forecast_date=forecast_date,
-        energy_score=energy_score,
-        summary=summary,
-        payload=payload,
+    if not supports_on_conflict_inserts(db):
+        # Generic path: the (user_id, forecast_date) unique constraint arbitrates concurrent inserts.
+        forecast = models.DailyForecast(**values)
+        db.add(forecast)
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing = _find_daily_forecast(db, user_id, forecast_date)
+            if existing:
+                return existing
+            raise
+        return forecast
+
+    stmt = (
+        insert_ignoring_conflicts(db, models.DailyForecast, ("user_id", "forecast_date"))
+        .values(**values)
+        .returning(models.DailyForecast)
     )
-    db.add(forecast)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-        existing = (
-            db.query(models.DailyForecast)
-            .filter(models.DailyForecast.user_id == user_id, models.DailyForecast.forecast_date == forecast_date)
-            .first()
-        )
-        if existing:
-            return existing
-        raise
+    forecast = db.scalars(stmt).one_or_none()
+    db.commit()
+    if forecast is not None:
+        return forecast
 
-    try:
-        db.refresh(forecast)
-    except (InvalidRequestError, Exception):
-        # Re-fetch from DB — handles SQLite StaticPool edge cases and other session issues.
-        db.rollback()
-        forecast = (
-            db.query(models.DailyForecast)
-            .filter(models.DailyForecast.user_id == user_id, models.DailyForecast.forecast_date == forecast_date)
-            .first()
-        )
-        if forecast is None:
-            raise RuntimeError("DailyForecast was committed but could not be retrieved")
+    # A concurrent request inserted the row first; RETURNING yields nothing on conflict.
+    forecast = _find_daily_forecast(db, user_id, forecast_date)
+    if forecast is None:
+        raise RuntimeError("DailyForecast insert conflicted but the existing row could not be retrieved")
     return forecast
 
 
-def _story_focus_playbook(focus: str) -> dict[str, str]:
-    normalized = focus.strip().lower()
-    mapping = {
-        "отношениях": {
-            "work_tip": "Назначьте один разговор, который давно откладывали, и заранее сформулируйте цель.",
-            "work_avoid": "Не обсуждайте важное в спешке и на эмоциях.",
-            "work_timing": "11:00-13:00 для переговоров и сверки ожиданий.",
-            "social_tip": "Спросите человека о его текущем запросе, прежде чем давать совет.",
-            "social_avoid": "Не делайте выводы по тону сообщения без уточнения.",
-            "social_timing": "18:00-21:00 для теплого диалога и встреч.",
-            "self_tip": "15 минут тишины без экрана перед сном снизят внутренний шум.",
-            "self_avoid": "Не перегружайте себя чужими задачами в ущерб своим.",
-        },
-        "карьере": {
-            "work_tip": "Сделайте один сложный блок задач в первой половине дня без переключений.",
-            "work_avoid": "Не распыляйтесь на многозадачность и мелкие срочные запросы.",
-            "work_timing": "09:30-12:00 для приоритетной задачи и решений.",
-            "social_tip": "На созвоне фиксируйте договоренности сразу в заметках.",
-            "social_avoid": "Не соглашайтесь на новые дедлайны без оценки нагрузки.",
-            "social_timing": "14:00-16:00 для встреч и согласований.",
-            "self_tip": "После рабочего пика сделайте прогулку 20 минут для восстановления фокуса.",
-            "self_avoid": "Не переносите рабочие мысли в вечер без плана на завтра.",
-        },
-        "финансах": {
-            "work_tip": "Проверьте автосписания и уберите одну лишнюю статью расходов сегодня.",
-            "work_avoid": "Не принимайте импульсивные решения о крупных покупках.",
-            "work_timing": "12:00-15:00 для расчётов, бюджета и сравнения вариантов.",
-            "social_tip": "Если обсуждаете деньги, проговорите сумму, срок и формат письменно.",
-            "social_avoid": "Не одалживайте, если нет четких условий возврата.",
-            "social_timing": "17:00-19:00 для спокойных финансовых договоренностей.",
-            "self_tip": "Закройте день короткой ревизией: что дало пользу, а что было лишним.",
-            "self_avoid": "Не компенсируйте стресс спонтанными тратами.",
-        },
-        "здоровье": {
-            "work_tip": "Разбейте день на блоки 50/10: 50 минут фокус, 10 минут перерыв.",
-            "work_avoid": "Не пропускайте воду и еду в активные часы.",
-            "work_timing": "08:30-11:30 для продуктивной работы с ясной головой.",
-            "social_tip": "Сократите лишние чаты, чтобы не перегружать нервную систему.",
-            "social_avoid": "Не втягивайтесь в конфликты, когда чувствуете усталость.",
-            "social_timing": "15:00-18:00 для спокойной коммуникации.",
-            "self_tip": "Добавьте мягкую физическую нагрузку и ранний уход в сон.",
-            "self_avoid": "Не дожимайте себя через силу в вечерние часы.",
-        },
-        "обучении": {
-            "work_tip": "Выберите одну тему и сделайте 30 минут глубокой практики с конспектом.",
-            "work_avoid": "Не перескакивайте между курсами и форматами.",
-            "work_timing": "10:00-12:30 для нового материала и закрепления.",
-            "social_tip": "Обсудите тему с человеком, который уже применял её на практике.",
-            "social_avoid": "Не спорьте о теории, пока нет собственного теста.",
-            "social_timing": "18:30-20:30 для обмена опытом и вопросов.",
-            "self_tip": "Закройте день коротким повторением ключевых тезисов на 10 минут.",
-            "self_avoid": "Не пытайтесь выучить всё за один день.",
-        },
+_STORY_FOCUS_MAPPING: Mapping[str, Mapping[str, str]] = MappingProxyType(
+    {
+        "отношениях": MappingProxyType(
+            {
+                "work_tip": "Назначьте один разговор, который давно откладывали, и заранее сформулируйте цель.",
+                "work_avoid": "Не обсуждайте важное в спешке и на эмоциях.",
+                "work_timing": "11:00-13:00 для переговоров и сверки ожиданий.",
+                "social_tip": "Спросите человека о его текущем запросе, прежде чем давать совет.",
+                "social_avoid": "Не делайте выводы по тону сообщения без уточнения.",
+                "social_timing": "18:00-21:00 для теплого диалога и встреч.",
+                "self_tip": "15 минут тишины без экрана перед сном снизят внутренний шум.",
+                "self_avoid": "Не перегружайте себя чужими задачами в ущерб своим.",
+            }
+        ),
+        "карьере": MappingProxyType(
+            {
+                "work_tip": "Сделайте один сложный блок задач в первой половине дня без переключений.",
+                "work_avoid": "Не распыляйтесь на многозадачность и мелкие срочные запросы.",
+                "work_timing": "09:30-12:00 для приоритетной задачи и решений.",
+                "social_tip": "На созвоне фиксируйте договоренности сразу в заметках.",
+                "social_avoid": "Не соглашайтесь на новые дедлайны без оценки нагрузки.",
+                "social_timing": "14:00-16:00 для встреч и согласований.",
+                "self_tip": "После рабочего пика сделайте прогулку 20 минут для восстановления фокуса.",
+                "self_avoid": "Не переносите рабочие мысли в вечер без плана на завтра.",
+            }
+        ),
+        "финансах": MappingProxyType(
+            {
+                "work_tip": "Проверьте автосписания и уберите одну лишнюю статью расходов сегодня.",
+                "work_avoid": "Не принимайте импульсивные решения о крупных покупках.",
+                "work_timing": "12:00-15:00 для расчётов, бюджета и сравнения вариантов.",
+                "social_tip": "Если обсуждаете деньги, проговорите сумму, срок и формат письменно.",
+                "social_avoid": "Не одалживайте, если нет четких условий возврата.",
+                "social_timing": "17:00-19:00 для спокойных финансовых договоренностей.",
+                "self_tip": "Закройте день короткой ревизией: что дало пользу, а что было лишним.",
+                "self_avoid": "Не компенсируйте стресс спонтанными тратами.",
+            }
+        ),
+        "здоровье": MappingProxyType(
+            {
+                "work_tip": "Разбейте день на блоки 50/10: 50 минут фокус, 10 минут перерыв.",
+                "work_avoid": "Не пропускайте воду и еду в активные часы.",
+                "work_timing": "08:30-11:30 для продуктивной работы с ясной головой.",
+                "social_tip": "Сократите лишние чаты, чтобы не перегружать нервную систему.",
+                "social_avoid": "Не втягивайтесь в конфликты, когда чувствуете усталость.",
+                "social_timing": "15:00-18:00 для спокойной коммуникации.",
+                "self_tip": "Добавьте мягкую физическую нагрузку и ранний уход в сон.",
+                "self_avoid": "Не дожимайте себя через силу в вечерние часы.",
+            }
+        ),
+        "обучении": MappingProxyType(
+            {
+                "work_tip": "Выберите одну тему и сделайте 30 минут глубокой практики с конспектом.",
+                "work_avoid": "Не перескакивайте между курсами и форматами.",
+                "work_timing": "10:00-12:30 для нового материала и закрепления.",
+                "social_tip": "Обсудите тему с человеком, который уже применял её на практике.",
+                "social_avoid": "Не спорьте о теории, пока нет собственного теста.",
+                "social_timing": "18:30-20:30 для обмена опытом и вопросов.",
+                "self_tip": "Закройте день коротким повторением ключевых тезисов на 10 минут.",
+                "self_avoid": "Не пытайтесь выучить всё за один день.",
+            }
+        ),
     }
-    default = {
+)
+_STORY_FOCUS_DEFAULT: Mapping[str, str] = MappingProxyType(
+    {
         "work_tip": "Выберите одну задачу с максимальным эффектом и завершите её до вечера.",
         "work_avoid": "Не разбрасывайтесь на второстепенные дела.",
         "work_timing": STORY_DEFAULT_TIMING,
@@ -1054,89 +1288,118 @@ def _story_focus_playbook(focus: str) -> dict[str, str]:
         "self_tip": "20 минут тишины или прогулки выровняют эмоциональный фон.",
         "self_avoid": "Не откладывайте отдых до полного выгорания.",
     }
-    return mapping.get(normalized, default)
+)
 
 
-def _build_fallback_story_slides(chart: models.NatalChart, forecast: models.DailyForecast, interpretation: dict) -> list[dict]:
-    payload = forecast.payload if isinstance(forecast.payload, dict) else {}
+@lru_cache(maxsize=64)
+def _story_focus_playbook(focus: str) -> Mapping[str, str]:
+    return _STORY_FOCUS_MAPPING.get(focus.strip().lower(), _STORY_FOCUS_DEFAULT)
+
+
+# (title, body, badge, tip, avoid, timing, animation); rendered with str.format_map.
+_FALLBACK_STORY_SLIDE_TEMPLATES = (
+    (
+        "Пульс дня",
+        "Энергия дня {energy_score}/100, режим: {mood}. "
+        "Связка Солнце {sun_sign}, Луна {moon_sign}, Асцендент {rising_sign} "
+        "лучше раскрывается через фокус на {focus}.",
+        "{energy_score}/100",
+        "Главный шаг: {work_tip}",
+        "{work_avoid}",
+        "{work_timing}",
+        "glow",
+    ),
+    (
+        "Работа и решения",
+        "Сегодня выигрывает структура: один приоритет, один измеримый результат. "
+        "Ключ натала: {first_aspect}",
+        "Фокус: {focus}",
+        "{work_tip}",
+        "{work_avoid}",
+        "{work_timing}",
+        "pulse",
+    ),
+    (
+        "Люди и диалог",
+        "В общении день просит ясных формулировок и спокойного темпа. "
+        "Лучше проверять договорённости письменно.",
+        "Режим: {mood}",
+        "{social_tip}",
+        "{social_avoid}",
+        "{social_timing}",
+        "orbit",
+    ),
+    (
+        "Ресурс и восстановление",
+        "Ваш личный КПД сегодня выше, если чередовать нагрузку и короткие паузы. "
+        "Вечером важнее восстановить нервную систему, чем добивать задачи.",
+        "Баланс",
+        "{self_tip}",
+        "{self_avoid}",
+        "После 20:00 — мягкий режим и снижение инфошума.",
+        "float",
+    ),
+)
+
+
+def _build_fallback_story_slides(
+    chart: models.NatalChart,
+    forecast: models.DailyForecast,
+    interpretation: Mapping,
+) -> list[dict]:
+    payload = forecast.payload if type(forecast.payload) is dict else _EMPTY_MAPPING
     mood = str(payload.get("mood") or "баланс")
     focus = str(payload.get("focus") or "приоритетах")
     playbook = _story_focus_playbook(focus)
 
     key_aspects = interpretation.get("key_aspects")
     first_aspect = ""
-    if isinstance(key_aspects, list) and key_aspects:
+    if type(key_aspects) is list and key_aspects:
         first_aspect = str(key_aspects[0]).strip()
     if not first_aspect:
-        first_aspect = "Делайте ставку на последовательность и аккуратную коммуникацию."
+        first_aspect = STORY_DEFAULT_FIRST_ASPECT
 
+    context = {
+        **playbook,
+        "energy_score": forecast.energy_score,
+        "mood": mood,
+        "focus": focus,
+        "sun_sign": chart.sun_sign,
+        "moon_sign": chart.moon_sign,
+        "rising_sign": chart.rising_sign,
+        "first_aspect": first_aspect,
+    }
     return [
         {
-            "title": "Пульс дня",
-            "body": (
-                f"Энергия дня {forecast.energy_score}/100, режим: {mood}. "
-                f"Связка Солнце {chart.sun_sign}, Луна {chart.moon_sign}, Асцендент {chart.rising_sign} "
-                f"лучше раскрывается через фокус на {focus}."
-            ),
-            "badge": f"{forecast.energy_score}/100",
-            "tip": f"Главный шаг: {playbook['work_tip']}",
-            "avoid": playbook["work_avoid"],
-            "timing": playbook["work_timing"],
-            "animation": "glow",
-        },
-        {
-            "title": "Работа и решения",
-            "body": (
-                "Сегодня выигрывает структура: один приоритет, один измеримый результат. "
-                f"Ключ натала: {first_aspect}"
-            ),
-            "badge": f"Фокус: {focus}",
-            "tip": playbook["work_tip"],
-            "avoid": playbook["work_avoid"],
-            "timing": playbook["work_timing"],
-            "animation": "pulse",
-        },
-        {
-            "title": "Люди и диалог",
-            "body": (
-                "В общении день просит ясных формулировок и спокойного темпа. "
-                "Лучше проверять договорённости письменно."
-            ),
-            "badge": f"Режим: {mood}",
-            "tip": playbook["social_tip"],
-            "avoid": playbook["social_avoid"],
-            "timing": playbook["social_timing"],
-            "animation": "orbit",
-        },
-        {
-            "title": "Ресурс и восстановление",
-            "body": (
-                "Ваш личный КПД сегодня выше, если чередовать нагрузку и короткие паузы. "
-                "Вечером важнее восстановить нервную систему, чем добивать задачи."
-            ),
-            "badge": "Баланс",
-            "tip": playbook["self_tip"],
-            "avoid": playbook["self_avoid"],
-            "timing": "После 20:00 — мягкий режим и снижение инфошума.",
-            "animation": "float",
-        },
+            "title": title,
+            "body": body.format_map(context),
+            "badge": badge.format_map(context),
+            "tip": tip.format_map(context),
+            "avoid": avoid.format_map(context),
+            "timing": timing.format_map(context),
+            "animation": animation,
+        }
+        for title, body, badge, tip, avoid, timing, animation in _FALLBACK_STORY_SLIDE_TEMPLATES
     ]
 
 
 def build_forecast_story_slides(chart: models.NatalChart, forecast: models.DailyForecast) -> tuple[list[dict], str | None]:
-    interpretation = {}
-    if isinstance(chart.chart_payload, dict):
-        interpretation = chart.chart_payload.get("interpretation", {}) or {}
+    chart_payload = chart.chart_payload
+    interpretation = chart_payload.get("interpretation") if type(chart_payload) is dict else None
+    if not interpretation:
+        interpretation = _EMPTY_MAPPING
+
+    # Settings are read on every call (not cached) so key/model changes apply immediately.
+    if not llm_text_enabled():
+        fallback_slides = _build_fallback_story_slides(chart=chart, forecast=forecast, interpretation=interpretation)
+        return fallback_slides, "local:fallback"
 
     key_aspects = interpretation.get("key_aspects")
     aspects_list: list[str] = []
-    if isinstance(key_aspects, list):
-        for item in key_aspects[:4]:
-            text = str(item).strip()
-            if text:
-                aspects_list.append(text)
+    if type(key_aspects) is list:
+        aspects_list = [text for item in islice(key_aspects, 4) if (text := str(item).strip())]
 
-    payload = forecast.payload if isinstance(forecast.payload, dict) else {}
+    payload = forecast.payload if type(forecast.payload) is dict else _EMPTY_MAPPING
     mood = str(payload.get("mood") or "баланс")
     focus = str(payload.get("focus") or "приоритетах")
     natal_summary = str(interpretation.get("summary") or "").strip()
@@ -1158,7 +1421,7 @@ def build_forecast_story_slides(chart: models.NatalChart, forecast: models.Daily
     return fallback_slides, "local:fallback"
 
 
-def draw_tarot_reading(
+async def draw_tarot_reading(
     db: Session,
     user_id: int,
     spread_type: str,
@@ -1171,9 +1434,9 @@ def draw_tarot_reading(
         user_id=user_id,
         spread_type=spread_type,
         question=question,
-        salt=datetime.now(timezone.utc).isoformat(),
+        salt=time_ns(),
     )
-    cards_payload = draw_cards(spread_type=spread_type, seed=seed)
+    cards_payload = await draw_cards(spread_type=spread_type, seed=seed)
 
     session = models.TarotSession(
         user_id=user_id,
@@ -1184,17 +1447,20 @@ def draw_tarot_reading(
     db.add(session)
     db.flush()
 
-    for card in cards_payload:
-        db.add(
-            models.TarotCard(
-                session_id=session.id,
-                position=card["position"],
-                slot_label=card["slot_label"],
-                card_name=card["card_name"],
-                is_reversed=card["is_reversed"],
-                meaning=card["meaning"],
-            )
-        )
+    db.bulk_insert_mappings(
+        models.TarotCard,
+        [
+            {
+                "session_id": session.id,
+                "position": card["position"],
+                "slot_label": card["slot_label"],
+                "card_name": card["card_name"],
+                "is_reversed": card["is_reversed"],
+                "meaning": card["meaning"],
+            }
+            for card in cards_payload
+        ],
+    )
 
     db.commit()
     db.refresh(session)
@@ -1202,18 +1468,15 @@ def draw_tarot_reading(
 
 
 def get_tarot_session(db: Session, user_id: int, session_id) -> models.TarotSession:
-    session = (
-        db.query(models.TarotSession)
-        .options(joinedload(models.TarotSession.cards))
-        .filter(models.TarotSession.id == session_id, models.TarotSession.user_id == user_id)
-        .first()
-    )
-    if not session:
+    session = db.get(models.TarotSession, session_id, options=[joinedload(models.TarotSession.cards)])
+    if session is None or session.user_id != user_id:
         raise HTTPException(status_code=404, detail="Tarot session not found")
     return session
 
 
 def build_tarot_cards_payload(cards: list[models.TarotCard]) -> list[dict]:
+    # TarotSession.cards is ordered by position in SQL (relationship order_by).
+    provider = settings.tarot_provider
     return [
         {
             "position": card.position,
@@ -1222,9 +1485,9 @@ def build_tarot_cards_payload(cards: list[models.TarotCard]) -> list[dict]:
             "is_reversed": card.is_reversed,
             "meaning": card.meaning,
             "image_url": card_image_url(card.card_name),
-            "provider": settings.tarot_provider,
+            "provider": provider,
         }
-        for card in sorted(cards, key=lambda c: c.position)
+        for card in cards
     ]
 
 
@@ -1,15 +1,24 @@
+import asyncio
+import hashlib
 import logging
+import random
 import uuid
+from collections.abc import Mapping
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import lru_cache
+from types import MappingProxyType
 
 import httpx
+import orjson
 from fastapi import HTTPException
+from sqlalchemy import Row, exists, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from . import models
 from .config import settings
+from .database import insert_ignoring_conflicts, supports_on_conflict_inserts
 
 logger = logging.getLogger("astrobot.star_payments")
 
@@ -25,6 +34,15 @@ WALLET_LEDGER_KIND_TOPUP = "topup_credit"
 WALLET_LEDGER_KIND_PREMIUM_DEBIT = "premium_debit"
 WALLET_LEDGER_KIND_PREMIUM_REFUND = "premium_refund"
 
+TELEGRAM_MAX_CONNECTIONS = 32
+TELEGRAM_MAX_KEEPALIVE_CONNECTIONS = 16
+TELEGRAM_MAX_ATTEMPTS = 3
+TELEGRAM_RETRY_BASE_DELAY_SECONDS = 0.1
+
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+_telegram_client: httpx.AsyncClient | None = None
+
 
 @dataclass(frozen=True)
 class PremiumAccessClaim:
@@ -45,29 +63,34 @@ def utcnow() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _product_catalog() -> dict[str, StarProduct]:
-    return {
+def _build_product_catalog(
+    natal_price: int,
+    tarot_price: int,
+    numerology_price: int,
+    compat_price: int,
+) -> Mapping[str, StarProduct]:
+    return MappingProxyType({
         "natal_premium": StarProduct(
             feature="natal_premium",
-            amount_stars=max(1, int(settings.stars_price_natal_premium)),
+            amount_stars=max(1, int(natal_price)),
             title="Детальный натальный отчёт",
             description="Персональный астрологический отчёт Gemini",
         ),
         "tarot_premium": StarProduct(
             feature="tarot_premium",
-            amount_stars=max(1, int(settings.stars_price_tarot_premium)),
+            amount_stars=max(1, int(tarot_price)),
             title="Глубокий расклад Таро",
             description="Расклад Таро с детальной интерпретацией Gemini",
         ),
         "numerology_premium": StarProduct(
             feature="numerology_premium",
-            amount_stars=max(1, int(settings.stars_price_numerology_premium)),
+            amount_stars=max(1, int(numerology_price)),
             title="Глубокий нумерологический отчёт",
             description="Подробный нумерологический анализ Gemini",
         ),
         "compat_premium": StarProduct(
             feature="compat_premium",
-            amount_stars=max(1, int(settings.stars_price_compat_premium)),
+            amount_stars=max(1, int(compat_price)),
             title="Глубокий разбор совместимости",
             description="Детальный анализ совместимости двух людей с рекомендациями Gemini",
         ),
@@ -89,14 +112,41 @@ def _product_catalog() -> dict[str, StarProduct]:
             title="Пополнение баланса на 99 ⭐",
             description="Пополнение внутреннего баланса Astrobot на 99 звёзд",
         ),
-    }
+    })
+
+
+_WALLET_TOPUP_PREFIX = "wallet_topup_"
+
+
+def reload_catalog() -> Mapping[str, StarProduct]:
+    """Rebuild the product catalog from the current ``stars_price_*`` settings."""
+    global _product_catalog_snapshot, _wallet_topup_features
+    _product_catalog_snapshot = _build_product_catalog(
+        settings.stars_price_natal_premium,
+        settings.stars_price_tarot_premium,
+        settings.stars_price_numerology_premium,
+        settings.stars_price_compat_premium,
+    )
+    _wallet_topup_features = frozenset(
+        feature for feature in _product_catalog_snapshot if feature.startswith(_WALLET_TOPUP_PREFIX)
+    )
+    return _product_catalog_snapshot
+
+
+_product_catalog_snapshot: Mapping[str, StarProduct]
+_wallet_topup_features: frozenset[str]
+reload_catalog()
+
+
+def _product_catalog() -> Mapping[str, StarProduct]:
+    return _product_catalog_snapshot
 
 
 def get_product(feature: str) -> StarProduct:
-    product = _product_catalog().get(feature)
-    if product is None:
-        raise HTTPException(status_code=400, detail="Неизвестный платный продукт")
-    return product
+    try:
+        return _product_catalog()[feature]
+    except KeyError:
+        raise HTTPException(status_code=400, detail="Неизвестный платный продукт") from None
 
 
 def list_products() -> list[StarProduct]:
@@ -104,28 +154,77 @@ def list_products() -> list[StarProduct]:
 
 
 def is_wallet_topup_feature(feature: str) -> bool:
-    return str(feature).startswith("wallet_topup_")
+    return feature in _wallet_topup_features
+
+
+@lru_cache(maxsize=8)
+def _telegram_method_url(bot_token: str, method: str) -> str:
+    return f"https://api.telegram.org/bot{bot_token}/{method}"
 
 
 def _telegram_api_url(method: str) -> str:
     if not settings.bot_token:
         raise HTTPException(status_code=503, detail="BOT_TOKEN не настроен")
-    return f"https://api.telegram.org/bot{settings.bot_token}/{method}"
+    return _telegram_method_url(settings.bot_token, method)
+
+
+def _get_telegram_client() -> httpx.AsyncClient:
+    global _telegram_client
+    if _telegram_client is None or _telegram_client.is_closed:
+        _telegram_client = httpx.AsyncClient(
+            timeout=settings.telegram_bot_api_timeout_seconds,
+            limits=httpx.Limits(
+                max_connections=TELEGRAM_MAX_CONNECTIONS,
+                max_keepalive_connections=TELEGRAM_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+        )
+    return _telegram_client
 
 
-async def _create_telegram_invoice_link(*, product: StarProduct, invoice_payload: str) -> str:
-    body = {
+async def close_telegram_client() -> None:
+    global _telegram_client
+    if _telegram_client is not None:
+        await _telegram_client.aclose()
+        _telegram_client = None
+
+
+@lru_cache(maxsize=32)
+def _invoice_body_base(product: StarProduct) -> Mapping[str, object]:
+    # Per-product invoice fields; callers copy it and add payload (and chat_id).
+    return MappingProxyType({
         "title": product.title,
         "description": product.description,
-        "payload": invoice_payload,
         "currency": STARS_CURRENCY,
-        "prices": [{"label": product.title, "amount": product.amount_stars}],
-    }
+        "prices": ({"label": product.title, "amount": product.amount_stars},),
+    })
+
+
+async def _post_telegram_with_retry(url: str, content: bytes) -> httpx.Response:
+    """POST to the Bot API, retrying transport errors and 5xx with jittered backoff.
+
+    Only for side-effect-free methods such as createInvoiceLink: sendInvoice would
+    post a duplicate message to the chat if a timed-out attempt had gone through.
+    """
+    client = _get_telegram_client()
+    for attempt in range(TELEGRAM_MAX_ATTEMPTS - 1):
+        try:
+            response = await client.post(url, content=content, headers=_JSON_HEADERS)
+        except httpx.TransportError as exc:
+            logger.info("Telegram request attempt %s failed, retrying: %s", attempt + 1, exc)
+        else:
+            if response.status_code < 500:
+                return response
+            logger.info("Telegram request attempt %s got HTTP %s, retrying", attempt + 1, response.status_code)
+        await asyncio.sleep(TELEGRAM_RETRY_BASE_DELAY_SECONDS * 2**attempt + random.random() * 0.05)
+    return await client.post(url, content=content, headers=_JSON_HEADERS)
+
+
+async def _create_telegram_invoice_link(*, product: StarProduct, invoice_payload: str) -> str:
+    body = {**_invoice_body_base(product), "payload": invoice_payload}
     try:
-        async with httpx.AsyncClient(timeout=settings.telegram_bot_api_timeout_seconds) as client:
-            response = await client.post(_telegram_api_url("createInvoiceLink"), json=body)
+        response = await _post_telegram_with_retry(_telegram_api_url("createInvoiceLink"), orjson.dumps(body))
         response.raise_for_status()
-        payload = response.json()
+        payload = orjson.loads(response.content)
     except HTTPException:
         raise
     except Exception as exc:
@@ -144,19 +243,16 @@ async def _send_telegram_invoice_to_chat(
     product: StarProduct,
     invoice_payload: str,
 ) -> None:
-    body = {
-        "chat_id": int(chat_id),
-        "title": product.title,
-        "description": product.description,
-        "payload": invoice_payload,
-        "currency": STARS_CURRENCY,
-        "prices": [{"label": product.title, "amount": product.amount_stars}],
-    }
+    body = {**_invoice_body_base(product), "chat_id": int(chat_id), "payload": invoice_payload}
     try:
-        async with httpx.AsyncClient(timeout=settings.telegram_bot_api_timeout_seconds) as client:
-            response = await client.post(_telegram_api_url("sendInvoice"), json=body)
+        client = _get_telegram_client()
+        response = await client.post(
+            _telegram_api_url("sendInvoice"),
+            content=orjson.dumps(body),
+            headers=_JSON_HEADERS,
+        )
         response.raise_for_status()
-        payload = response.json()
+        payload = orjson.loads(response.content)
     except HTTPException:
         raise
     except Exception as exc:
@@ -168,14 +264,33 @@ async def _send_telegram_invoice_to_chat(
         raise HTTPException(status_code=502, detail="Telegram не отправил счёт в чат")
 
 
+# (status_code, detail) per payment status. Exceptions are built per call since a
+# raised instance carries its traceback and must not be shared between requests.
+_PAYMENT_STATUS_ERRORS: Mapping[str, tuple[int, str]] = MappingProxyType({
+    PAYMENT_STATUS_CREATED: (409, "Оплата ещё не подтверждена Telegram"),
+    PAYMENT_STATUS_INVOICED: (409, "Оплата ещё не подтверждена Telegram"),
+    PAYMENT_STATUS_CONSUMED: (409, "Платёж уже использован"),
+    PAYMENT_STATUS_FAILED: (402, "Оплата не завершена"),
+    PAYMENT_STATUS_CANCELLED: (402, "Оплата не завершена"),
+})
+_DEFAULT_PAYMENT_STATUS_ERROR = (402, "Требуется оплата Stars")
+
+
 def _payment_error_for_status(status: str) -> HTTPException:
-    if status in {PAYMENT_STATUS_CREATED, PAYMENT_STATUS_INVOICED}:
-        return HTTPException(status_code=409, detail="Оплата ещё не подтверждена Telegram")
-    if status == PAYMENT_STATUS_CONSUMED:
-        return HTTPException(status_code=409, detail="Платёж уже использован")
-    if status in {PAYMENT_STATUS_FAILED, PAYMENT_STATUS_CANCELLED}:
-        return HTTPException(status_code=402, detail="Оплата не завершена")
-    return HTTPException(status_code=402, detail="Требуется оплата Stars")
+    status_code, detail = _PAYMENT_STATUS_ERRORS.get(status, _DEFAULT_PAYMENT_STATUS_ERROR)
+    return HTTPException(status_code=status_code, detail=detail)
+
+
+def _invoice_idempotency_hash(user_id: int, feature: str, idempotency_key: str) -> str:
+    return hashlib.sha256(f"{user_id}:{feature}:{idempotency_key}".encode("utf-8")).hexdigest()
+
+
+def _get_payment_by_idempotency_hash(db: Session, *, user_id: int, key_hash: str) -> models.StarPayment | None:
+    return (
+        db.query(models.StarPayment)
+        .filter(models.StarPayment.user_id == user_id, models.StarPayment.idempotency_key == key_hash)
+        .first()
+    )
 
 
 async def create_invoice_for_user(
@@ -184,9 +299,64 @@ async def create_invoice_for_user(
     user: models.User,
     feature: str,
     meta_payload: dict | None = None,
+    idempotency_key: str | None = None,
 ) -> models.StarPayment:
     product = get_product(feature)
+    key_hash = _invoice_idempotency_hash(user.id, product.feature, idempotency_key) if idempotency_key else None
+    if key_hash is not None:
+        existing = _get_payment_by_idempotency_hash(db, user_id=user.id, key_hash=key_hash)
+        if existing is not None:
+            return existing
+
     invoice_payload = f"stars:{feature}:{user.tg_user_id}:{uuid.uuid4().hex}"
+    try:
+        invoice_link = await _create_telegram_invoice_link(product=product, invoice_payload=invoice_payload)
+    except HTTPException:
+        # Failed rows keep no idempotency key so a retry with the same key can try again.
+        _insert_invoice_payment(
+            db,
+            user=user,
+            product=product,
+            invoice_payload=invoice_payload,
+            meta_payload=meta_payload,
+            status=PAYMENT_STATUS_FAILED,
+        )
+        raise
+
+    # The row is only persisted once Telegram has answered, so each outcome is a single INSERT.
+    try:
+        return _insert_invoice_payment(
+            db,
+            user=user,
+            product=product,
+            invoice_payload=invoice_payload,
+            meta_payload=meta_payload,
+            status=PAYMENT_STATUS_INVOICED,
+            invoice_link=invoice_link,
+            idempotency_key=key_hash,
+        )
+    except IntegrityError:
+        db.rollback()
+        if key_hash is None:
+            raise
+        # A concurrent request with the same key won the insert; hand back its invoice.
+        existing = _get_payment_by_idempotency_hash(db, user_id=user.id, key_hash=key_hash)
+        if existing is None:
+            raise
+        return existing
+
+
+def _insert_invoice_payment(
+    db: Session,
+    *,
+    user: models.User,
+    product: StarProduct,
+    invoice_payload: str,
+    meta_payload: dict | None,
+    status: str,
+    invoice_link: str | None = None,
+    idempotency_key: str | None = None,
+) -> models.StarPayment:
     now = utcnow()
     payment = models.StarPayment(
         user_id=user.id,
@@ -194,8 +364,10 @@ async def create_invoice_for_user(
         feature=product.feature,
         amount_stars=product.amount_stars,
         currency=STARS_CURRENCY,
-        status=PAYMENT_STATUS_CREATED,
+        status=status,
         invoice_payload=invoice_payload,
+        invoice_link=invoice_link,
+        idempotency_key=idempotency_key,
         meta_payload=meta_payload,
         created_at=now,
         updated_at=now,
@@ -203,23 +375,6 @@ async def create_invoice_for_user(
     db.add(payment)
     db.commit()
     db.refresh(payment)
-
-    try:
-        invoice_link = await _create_telegram_invoice_link(product=product, invoice_payload=invoice_payload)
-    except HTTPException:
-        payment.status = PAYMENT_STATUS_FAILED
-        payment.updated_at = utcnow()
-        db.add(payment)
-        db.commit()
-        db.refresh(payment)
-        raise
-
-    payment.invoice_link = invoice_link
-    payment.status = PAYMENT_STATUS_INVOICED
-    payment.updated_at = utcnow()
-    db.add(payment)
-    db.commit()
-    db.refresh(payment)
     return payment
 
 
@@ -235,8 +390,8 @@ def get_user_payment(db: Session, *, user: models.User, payment_id: uuid.UUID) -
 
 
 def get_wallet_balance(db: Session, *, user: models.User) -> int:
-    db.refresh(user)
-    return max(0, int(user.wallet_balance or 0))
+    balance = db.query(models.User.wallet_balance).filter(models.User.id == user.id).scalar()
+    return max(0, int(balance or 0))
 
 
 def list_wallet_ledger_entries(
@@ -255,19 +410,39 @@ def list_wallet_ledger_entries(
     )
 
 
-def _credit_wallet_for_paid_topup_if_needed(db: Session, *, payment: models.StarPayment) -> None:
+def _credit_wallet_for_paid_topup_if_needed(db: Session, *, payment: models.StarPayment | Row) -> None:
     if not is_wallet_topup_feature(payment.feature):
         return
 
-    existing = (
-        db.query(models.WalletLedger)
-        .filter(models.WalletLedger.star_payment_id == payment.id)
-        .first()
-    )
-    if existing is not None:
-        return
-
     now = utcnow()
+    ledger_values = {
+        "user_id": payment.user_id,
+        "tg_user_id": payment.tg_user_id,
+        "delta_stars": int(payment.amount_stars),
+        "kind": WALLET_LEDGER_KIND_TOPUP,
+        "feature": payment.feature,
+        "star_payment_id": payment.id,
+        "created_at": now,
+        "meta_payload": {"source": "stars_payment"},
+    }
+    # The unique star_payment_id makes the ledger insert the idempotency gate:
+    # RETURNING yields nothing when this payment was already credited.
+    if supports_on_conflict_inserts(db):
+        stmt = (
+            insert_ignoring_conflicts(db, models.WalletLedger, ("star_payment_id",))
+            .values(**ledger_values)
+            .returning(models.WalletLedger.id)
+        )
+        if db.execute(stmt).scalar_one_or_none() is None:
+            return
+    else:
+        # Generic path: a savepoint keeps the caller's transaction usable after a duplicate.
+        try:
+            with db.begin_nested():
+                db.add(models.WalletLedger(**ledger_values))
+        except IntegrityError:
+            return
+
     updated = (
         db.query(models.User)
         .filter(models.User.id == payment.user_id)
@@ -282,31 +457,17 @@ def _credit_wallet_for_paid_topup_if_needed(db: Session, *, payment: models.Star
     if updated != 1:
         raise HTTPException(status_code=404, detail="Пользователь платежа не найден")
 
-    ledger = models.WalletLedger(
-        user_id=payment.user_id,
-        tg_user_id=payment.tg_user_id,
-        delta_stars=int(payment.amount_stars),
-        kind=WALLET_LEDGER_KIND_TOPUP,
-        feature=payment.feature,
-        star_payment_id=payment.id,
-        created_at=now,
-        meta_payload={"source": "stars_payment"},
-    )
-    db.add(ledger)
-    try:
-        db.commit()
-    except IntegrityError:
-        db.rollback()
-
 
 def claim_wallet_balance_for_feature(
     db: Session,
     *,
     user: models.User,
     feature: str,
+    cost: int | None = None,
 ) -> models.WalletLedger:
-    product = get_product(feature)
-    cost = int(product.amount_stars)
+    if cost is None:
+        cost = get_product(feature).amount_stars
+    cost = int(cost)
     now = utcnow()
 
     updated = (
@@ -344,6 +505,15 @@ def claim_wallet_balance_for_feature(
     return ledger
 
 
+def _refund_exists(db: Session, *, debit_id: uuid.UUID) -> bool:
+    return db.query(
+        exists().where(
+            models.WalletLedger.related_ledger_id == debit_id,
+            models.WalletLedger.kind == WALLET_LEDGER_KIND_PREMIUM_REFUND,
+        )
+    ).scalar()
+
+
 def restore_wallet_spend(
     db: Session,
     *,
@@ -362,15 +532,7 @@ def restore_wallet_spend(
     if debit is None:
         return
 
-    refund_exists = (
-        db.query(models.WalletLedger.id)
-        .filter(
-            models.WalletLedger.related_ledger_id == debit.id,
-            models.WalletLedger.kind == WALLET_LEDGER_KIND_PREMIUM_REFUND,
-        )
-        .first()
-    )
-    if refund_exists:
+    if _refund_exists(db, debit_id=debit.id):
         return
 
     refund_amount = abs(int(debit.delta_stars or 0))
@@ -438,8 +600,29 @@ def mark_payment_paid_from_telegram(
     total_amount: int,
     telegram_payment_charge_id: str | None,
     provider_payment_charge_id: str | None,
-) -> models.StarPayment:
-    payment = db.query(models.StarPayment).filter(models.StarPayment.invoice_payload == invoice_payload).first()
+) -> Row:
+    """Confirm a Telegram Stars payment and return its ``id, tg_user_id, feature, status``.
+
+    Runs on Core statements only: the webhook never hydrates a StarPayment.
+    """
+    # Row lock serialises duplicate webhooks; status, charge ids and the wallet
+    # credit are then written in the same transaction with a single commit.
+    payment = db.execute(
+        select(
+            models.StarPayment.id,
+            models.StarPayment.user_id,
+            models.StarPayment.tg_user_id,
+            models.StarPayment.feature,
+            models.StarPayment.amount_stars,
+            models.StarPayment.currency,
+            models.StarPayment.status,
+            models.StarPayment.paid_at,
+            models.StarPayment.telegram_payment_charge_id,
+            models.StarPayment.provider_payment_charge_id,
+        )
+        .where(models.StarPayment.invoice_payload == invoice_payload)
+        .with_for_update()
+    ).first()
     if payment is None:
         raise HTTPException(status_code=404, detail="Платёж по invoice_payload не найден")
 
@@ -453,19 +636,34 @@ def mark_payment_paid_from_telegram(
     if telegram_payment_charge_id and payment.telegram_payment_charge_id not in (None, telegram_payment_charge_id):
         raise HTTPException(status_code=409, detail="Платёж уже подтверждён другим charge_id")
 
+    now = utcnow()
+    # Only write the columns that change, so concurrent writers of other fields are not clobbered.
+    values: dict[str, object] = {"updated_at": now}
+    if telegram_payment_charge_id and telegram_payment_charge_id != payment.telegram_payment_charge_id:
+        values["telegram_payment_charge_id"] = telegram_payment_charge_id
+    if provider_payment_charge_id and provider_payment_charge_id != payment.provider_payment_charge_id:
+        values["provider_payment_charge_id"] = provider_payment_charge_id
     # Idempotent: keep consumed status if report was already started.
     if payment.status not in {PAYMENT_STATUS_PAID, PAYMENT_STATUS_CONSUMED}:
-        payment.status = PAYMENT_STATUS_PAID
-        payment.paid_at = payment.paid_at or utcnow()
-
-    payment.telegram_payment_charge_id = telegram_payment_charge_id or payment.telegram_payment_charge_id
-    payment.provider_payment_charge_id = provider_payment_charge_id or payment.provider_payment_charge_id
-    payment.updated_at = utcnow()
-    db.add(payment)
-    db.commit()
-    db.refresh(payment)
+        values["status"] = PAYMENT_STATUS_PAID
+        if payment.paid_at is None:
+            values["paid_at"] = now
+
+    confirmed = db.execute(
+        update(models.StarPayment)
+        .where(models.StarPayment.id == payment.id)
+        .values(**values)
+        .returning(
+            models.StarPayment.id,
+            models.StarPayment.tg_user_id,
+            models.StarPayment.feature,
+            models.StarPayment.status,
+        )
+        .execution_options(synchronize_session=False)
+    ).one()
     _credit_wallet_for_paid_topup_if_needed(db, payment=payment)
-    return payment
+    db.commit()
+    return confirmed
 
 
 def claim_paid_payment_for_feature(
@@ -478,35 +676,30 @@ def claim_paid_payment_for_feature(
     if payment_id is None:
         raise HTTPException(status_code=402, detail="Для премиум-отчёта нужна оплата Stars")
 
-    payment = get_user_payment(db, user=user, payment_id=payment_id)
-    if payment.feature != feature:
-        raise HTTPException(status_code=409, detail="Платёж относится к другому типу отчёта")
-    if payment.status != PAYMENT_STATUS_PAID:
-        raise _payment_error_for_status(payment.status)
-
     now = utcnow()
-    updated = (
-        db.query(models.StarPayment)
-        .filter(
-            models.StarPayment.id == payment.id,
+    # Compare-and-set plus fetch in one statement; the happy path never SELECTs.
+    stmt = (
+        update(models.StarPayment)
+        .where(
+            models.StarPayment.id == payment_id,
             models.StarPayment.user_id == user.id,
+            models.StarPayment.feature == feature,
             models.StarPayment.status == PAYMENT_STATUS_PAID,
         )
-        .update(
-            {
-                models.StarPayment.status: PAYMENT_STATUS_CONSUMED,
-                models.StarPayment.consumed_at: now,
-                models.StarPayment.updated_at: now,
-            },
-            synchronize_session=False,
-        )
+        .values(status=PAYMENT_STATUS_CONSUMED, consumed_at=now, updated_at=now)
+        .returning(models.StarPayment)
+        .execution_options(synchronize_session=False, populate_existing=True)
     )
-    db.commit()
-    if updated != 1:
-        payment = get_user_payment(db, user=user, payment_id=payment_id)
-        raise _payment_error_for_status(payment.status)
+    payment = db.scalars(stmt).one_or_none()
+    if payment is not None:
+        db.commit()
+        return payment
 
-    return get_user_payment(db, user=user, payment_id=payment_id)
+    db.rollback()
+    payment = get_user_payment(db, user=user, payment_id=payment_id)
+    if payment.feature != feature:
+        raise HTTPException(status_code=409, detail="Платёж относится к другому типу отчёта")
+    raise _payment_error_for_status(payment.status)
 
 
 def restore_consumed_payment_to_paid(
@@ -576,7 +769,13 @@ def claim_premium_access(
         payment = claim_paid_payment_for_feature(db, user=user, feature=feature, payment_id=payment_id)
         return PremiumAccessClaim(source="payment", payment_id=payment.id)
     if use_wallet:
-        entry = claim_wallet_balance_for_feature(db, user=user, feature=feature)
+        product = get_product(feature)
+        entry = claim_wallet_balance_for_feature(
+            db,
+            user=user,
+            feature=product.feature,
+            cost=product.amount_stars,
+        )
         return PremiumAccessClaim(source="wallet", wallet_ledger_id=entry.id)
     raise HTTPException(status_code=402, detail="Для премиум-отчёта нужна оплата Stars или баланс кошелька")
 
@@ -678,15 +877,7 @@ def restore_premium_claim_by_task_id(db: Session, *, job_id: str) -> bool:
     if debit is None:
         return False
 
-    refund_exists = (
-        db.query(models.WalletLedger.id)
-        .filter(
-            models.WalletLedger.related_ledger_id == debit.id,
-            models.WalletLedger.kind == WALLET_LEDGER_KIND_PREMIUM_REFUND,
-        )
-        .first()
-    )
-    if refund_exists:
+    if _refund_exists(db, debit_id=debit.id):
         return False
 
     refund_amount = abs(int(debit.delta_stars or 0))
@@ -744,7 +935,5 @@ async def send_payment_invoice_to_chat(
     if payment.status == PAYMENT_STATUS_CREATED:
         payment.status = PAYMENT_STATUS_INVOICED
     payment.updated_at = utcnow()
-    db.add(payment)
     db.commit()
-    db.refresh(payment)
     return payment
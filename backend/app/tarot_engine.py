@@ -2,6 +2,7 @@ import hashlib
 import json
 import logging
 import random
+from dataclasses import dataclass
 from functools import lru_cache
 from pathlib import Path
 from typing import Any
@@ -70,6 +71,10 @@ SUIT_TO_PREFIX = {
 
 logger = logging.getLogger("astrobot.tarot_engine")
 
+TAROTAPI_MAX_KEEPALIVE_CONNECTIONS = 20
+
+_tarotapi_client: httpx.AsyncClient | None = None
+
 
 @lru_cache(maxsize=1)
 def load_deck() -> list[dict[str, Any]]:
@@ -80,9 +85,24 @@ def load_deck() -> list[dict[str, Any]]:
     return data
 
 
+@dataclass(frozen=True, slots=True)
+class DeckCard:
+    name: str
+    upright: str
+    reversed: str
+
+
+@lru_cache(maxsize=1)
+def _prebuilt_deck() -> tuple[DeckCard, ...]:
+    return tuple(
+        DeckCard(name=card["name"], upright=card["upright"], reversed=card["reversed"])
+        for card in load_deck()
+    )
+
+
 @lru_cache(maxsize=1)
-def deck_by_name() -> dict[str, dict[str, Any]]:
-    return {card["name"]: card for card in load_deck()}
+def _prebuilt_deck_by_name() -> dict[str, DeckCard]:
+    return {card.name: card for card in _prebuilt_deck()}
 
 
 
@@ -91,44 +111,64 @@ def supported_spreads() -> list[str]:
 
 
 
-def build_seed(user_id: int | None, spread_type: str, question: str | None, salt: str) -> str:
+def build_seed(user_id: int | None, spread_type: str, question: str | None, salt: str | int) -> str:
     payload = f"{user_id or 'anon'}|{spread_type}|{question or ''}|{salt}"
     return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
 
 
-def _card_image_code(card_name: str) -> str | None:
-    if card_name in MAJOR_ARCANA:
-        idx = MAJOR_ARCANA.index(card_name)
-        return f"m{idx:02d}"
+_CARD_CODE: dict[str, str] = {
+    **{name: f"m{idx:02d}" for idx, name in enumerate(MAJOR_ARCANA)},
+    **{
+        f"{rank} of {suit}": f"{prefix}{number:02d}"
+        for rank, number in RANK_TO_NUMBER.items()
+        for suit, prefix in SUIT_TO_PREFIX.items()
+    },
+}
 
-    if " of " not in card_name:
-        return None
 
-    rank, suit = card_name.split(" of ", maxsplit=1)
-    number = RANK_TO_NUMBER.get(rank)
-    prefix = SUIT_TO_PREFIX.get(suit)
-    if number is None or prefix is None:
-        return None
-
-    return f"{prefix}{number:02d}"
+def _card_image_code(card_name: str) -> str | None:
+    return _CARD_CODE.get(card_name)
 
 
 
-def card_image_url(card_name: str) -> str | None:
+@lru_cache(maxsize=256)
+def _card_image_url(card_name: str, base_url: str) -> str | None:
     code = _card_image_code(card_name)
     if not code:
         return None
-    return f"{settings.tarot_image_base_url.rstrip('/')}/{code}.jpg"
+    return f"{base_url.rstrip('/')}/{code}.jpg"
 
 
+def card_image_url(card_name: str) -> str | None:
+    # Base URL is part of the cache key so a changed setting is honoured.
+    return _card_image_url(card_name, settings.tarot_image_base_url)
+
+
+
+def _get_tarotapi_client() -> httpx.AsyncClient:
+    global _tarotapi_client
+    if _tarotapi_client is None or _tarotapi_client.is_closed:
+        _tarotapi_client = httpx.AsyncClient(
+            timeout=settings.tarotapi_timeout_seconds,
+            limits=httpx.Limits(max_keepalive_connections=TAROTAPI_MAX_KEEPALIVE_CONNECTIONS),
+        )
+    return _tarotapi_client
+
+
+async def close_tarotapi_client() -> None:
+    global _tarotapi_client
+    if _tarotapi_client is not None:
+        await _tarotapi_client.aclose()
+        _tarotapi_client = None
 
-def _draw_from_tarotapi(card_count: int) -> list[dict[str, Any]] | None:
+
+async def _draw_from_tarotapi(card_count: int) -> list[dict[str, Any]] | None:
     base_url = settings.tarotapi_base_url.rstrip("/")
     url = f"{base_url}/cards/random"
 
     try:
-        response = httpx.get(url, params={"n": card_count}, timeout=settings.tarotapi_timeout_seconds)
+        response = await _get_tarotapi_client().get(url, params={"n": card_count})
         response.raise_for_status()
         payload = response.json()
     except Exception:
@@ -151,7 +191,7 @@ def _draw_from_tarotapi(card_count: int) -> list[dict[str, Any]] | None:
 
 
 
-def draw_cards(spread_type: str, seed: str) -> list[dict]:
+async def draw_cards(spread_type: str, seed: str) -> list[dict]:
     positions = SPREADS.get(spread_type)
     if not positions:
         raise ValueError(f"Unsupported spread: {spread_type}")
@@ -165,33 +205,34 @@ def draw_cards(spread_type: str, seed: str) -> list[dict]:
         tarot_provider = "local"
 
     if tarot_provider == "tarotapi_dev":
-        provider_cards = _draw_from_tarotapi(len(positions))
+        provider_cards = await _draw_from_tarotapi(len(positions))
 
     if provider_cards is None:
-        cards = rng.sample(load_deck(), k=len(positions))
+        cards = rng.sample(_prebuilt_deck(), k=len(positions))
         provider = "local"
     else:
         cards = provider_cards
         provider = "tarotapi.dev"
 
-    local_deck = deck_by_name()
+    local_deck = _prebuilt_deck_by_name()
+    # One draw for every reversal flag: bit (idx - 1) decides the card at position idx.
+    reversed_bits = rng.getrandbits(len(positions))
     output: list[dict] = []
 
     for idx, (slot_label, card) in enumerate(zip(positions, cards), start=1):
-        card_name = str(card.get("name") or "").strip()
-        if not card_name:
-            continue
-
-        local_card = local_deck.get(card_name)
-
-        is_reversed = rng.random() < 0.5
-        if provider == "tarotapi.dev":
-            meaning = str(card.get("meaning_rev") if is_reversed else card.get("meaning_up") or "").strip()
+        is_reversed = bool((reversed_bits >> (idx - 1)) & 1)
+        if provider == "local":
+            card_name = card.name
+            meaning = card.reversed if is_reversed else card.upright
         else:
-            meaning = ""
-
-        if not meaning and local_card:
-            meaning = local_card["reversed"] if is_reversed else local_card["upright"]
+            card_name = str(card.get("name") or "").strip()
+            if not card_name:
+                continue
+            meaning = str(card.get("meaning_rev") if is_reversed else card.get("meaning_up") or "").strip()
+            if not meaning:
+                local_card = local_deck.get(card_name)
+                if local_card is not None:
+                    meaning = local_card.reversed if is_reversed else local_card.upright
 
         output.append(
             {
@@ -3,6 +3,7 @@ import hmac
 import json
 import time
 from dataclasses import dataclass
+from functools import lru_cache
 from urllib.parse import parse_qsl
 
 
@@ -13,26 +14,40 @@ class TelegramAuthResult:
     payload: dict
 
 
-def _build_data_check_string(payload: dict[str, str]) -> str:
-    parts: list[str] = []
-    for key in sorted(payload.keys()):
-        parts.append(f"{key}={payload[key]}")
-    return "\n".join(parts)
+def _data_check_digest(secret_key: bytes, fields: list[tuple[str, str]]) -> bytes:
+    """HMAC the ``key=value`` lines sorted by key without joining them into one string."""
+    mac = hmac.new(secret_key, digestmod=hashlib.sha256)
+    separator = b""
+    # UTF-8 preserves code point order, so sorting the str pairs matches sorting their bytes.
+    for key, value in sorted(fields):
+        mac.update(separator + key.encode("utf-8") + b"=" + value.encode("utf-8"))
+        separator = b"\n"
+    return mac.digest()
+
+
+@lru_cache(maxsize=4)
+def _webapp_secret_key(bot_token: str) -> bytes:
+    return hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
 
 
 def verify_init_data(init_data: str, bot_token: str, max_age_seconds: int) -> TelegramAuthResult:
-    parsed = dict(parse_qsl(init_data, keep_blank_values=True))
-    received_hash = parsed.pop("hash", None)
+    received_hash: str | None = None
+    fields: list[tuple[str, str]] = []
+    for key, value in parse_qsl(init_data, keep_blank_values=True):
+        if key == "hash":
+            received_hash = value
+        else:
+            fields.append((key, value))
     if not received_hash:
         return TelegramAuthResult(ok=False, reason="Missing hash", payload={})
 
-    data_check_string = _build_data_check_string(parsed)
-    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
-    calculated_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+    calculated_hash = _data_check_digest(_webapp_secret_key(bot_token), fields).hex()
 
-    if not hmac.compare_digest(calculated_hash, received_hash):
+    # Compare the exact lowercase hex spelling so re-encoded variants of a valid hash are rejected.
+    if not hmac.compare_digest(calculated_hash.encode("ascii"), received_hash.encode("utf-8")):
         return TelegramAuthResult(ok=False, reason="Hash mismatch", payload={})
 
+    parsed = dict(fields)
     auth_date_raw = parsed.get("auth_date")
     if not auth_date_raw:
         return TelegramAuthResult(ok=False, reason="Missing auth_date", payload={})
@@ -45,7 +60,7 @@ def verify_init_data(init_data: str, bot_token: str, max_age_seconds: int) -> Te
     if int(time.time()) - auth_date > max_age_seconds:
         return TelegramAuthResult(ok=False, reason="initData expired", payload={})
 
-    decoded_payload: dict = dict(parsed)
+    decoded_payload: dict = parsed
     if "user" in decoded_payload:
         try:
             decoded_payload["user"] = json.loads(decoded_payload["user"])
@@ -1,15 +1,20 @@
 """ARQ worker: async LLM tasks executed outside the HTTP request cycle."""
 from __future__ import annotations
 
-import json
+import asyncio
 import logging
+import logging.config
 from typing import Any
 
+import orjson
+import uvloop
 from arq.connections import RedisSettings
+from arq.logs import default_log_config
+from arq.worker import run_worker
 
 from .config import settings
 from .database import SessionLocal
-from .history import save_report_to_history
+from .history import stage_report_to_history
 from . import star_payments as _star_payments
 from .llm_engine import (
     interpret_natal_sections_async,
@@ -31,8 +36,17 @@ PREMIUM_LLM_FAILURE_MESSAGE = (
     "Попробуйте еще раз через 1-2 минуты."
 )
 
+# Failure payloads are identical for every job, so they are serialized once.
+_PREMIUM_LLM_FAILURE_PAYLOAD = orjson.dumps({"status": "failed", "error": PREMIUM_LLM_FAILURE_MESSAGE})
+_INTERNAL_ERROR_PAYLOAD = orjson.dumps({"status": "failed", "error": "Внутренняя ошибка при генерации отчёта"})
 
-def _restore_premium_claim(job_id: str, user_id: int) -> None:
+# Report fields tried in order for the short history preview.
+_NUMEROLOGY_PREVIEW_KEYS = ("core_essence", "life_purpose", "strengths")
+_NATAL_PREVIEW_KEYS = ("core_essence", "life_mission", "strengths")
+_TAROT_PREVIEW_KEYS = ("synthesis", "overall_energy", "advice")
+
+
+def _restore_premium_claim_sync(job_id: str, user_id: int) -> None:
     """Restore a consumed payment/wallet debit so user can retry after LLM failure."""
     db = SessionLocal()
     try:
@@ -50,6 +64,89 @@ def _restore_premium_claim(job_id: str, user_id: int) -> None:
         db.close()
 
 
+async def _restore_premium_claim(job_id: str, user_id: int) -> None:
+    """Run the blocking DB restore in a thread so other jobs keep the event loop."""
+    await asyncio.to_thread(_restore_premium_claim_sync, job_id, user_id)
+
+
+def _task_key(job_id: str) -> str:
+    return f"arq_task:{job_id}"
+
+
+async def _store_task_result(redis: Any, job_id: str, result: dict[str, Any]) -> None:
+    """Publish a finished result under the key the frontend polls."""
+    task_payload = orjson.dumps({"status": "done", "result": result})
+    await redis.setex(_task_key(job_id), ARQ_TASK_TTL, task_payload)
+
+
+async def _store_task_result_and_history(
+    redis: Any,
+    job_id: str,
+    result: dict[str, Any],
+    *,
+    tg_user_id: int,
+    report_type: str,
+    report_id: str,
+    is_premium: bool,
+    summary: dict,
+) -> None:
+    """Publish the result and its history entry in one pipelined round trip.
+
+    Only a failed task-key write is raised; history errors (including a summary
+    that cannot be serialized) are logged like in ``save_report_to_history``.
+    """
+    task_payload = orjson.dumps({"status": "done", "result": result})
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.setex(_task_key(job_id), ARQ_TASK_TTL, task_payload)
+        try:
+            stage_report_to_history(
+                pipe,
+                tg_user_id=tg_user_id,
+                report_type=report_type,
+                report_id=report_id,
+                is_premium=is_premium,
+                summary=summary,
+            )
+        except Exception:
+            logger.exception("Failed to save report to history | tg_user_id=%s | type=%s", tg_user_id, report_type)
+        results = await pipe.execute(raise_on_error=False)
+    if isinstance(results[0], Exception):
+        raise results[0]
+    history_errors = [r for r in results[1:] if isinstance(r, Exception)]
+    if history_errors:
+        logger.error(
+            "Failed to save report to history | tg_user_id=%s | type=%s | err=%s",
+            tg_user_id, report_type, history_errors[0],
+        )
+
+
+def _load_legacy_fallback(raw: str | None) -> list[dict]:
+    """Decode a fallback from a job enqueued with the old JSON-string kwargs."""
+    if not raw:
+        return []
+    try:
+        return orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return []
+
+
+def _report_preview(report: Any, keys: tuple[str, ...]) -> str:
+    """Return the first non-blank string among ``keys``, cut to 120 chars."""
+    if not isinstance(report, dict):
+        return ""
+    for key in keys:
+        val = report.get(key)
+        if isinstance(val, str) and (val := val.strip()):
+            return val[:120]
+    return ""
+
+
+async def _fail_premium_task(redis: Any, job_id: str, user_id: int, failure_payload: bytes) -> None:
+    """Publish a failed status for the poller and give the user their claim back."""
+    await redis.setex(_task_key(job_id), ARQ_TASK_TTL, failure_payload)
+    await _restore_premium_claim(job_id, user_id)
+
+
 async def task_generate_natal(
     ctx: dict[str, Any],
     *,
@@ -74,7 +171,8 @@ async def task_generate_natal(
     essential_dignities: list[str],
     configurations: list[str],
     full_aspects: list[str],
-    static_sections_json: str,  # pre-built fallback sections from _build_natal_sections
+    static_sections: list[dict] | None = None,  # pre-built fallback sections from _build_natal_sections
+    static_sections_json: str | None = None,  # legacy name, still sent by jobs queued before the list kwarg
 ) -> dict[str, Any]:
     job_id: str = ctx["job_id"]
     redis = ctx["redis"]
@@ -105,10 +203,8 @@ async def task_generate_natal(
         final_sections: list[dict] = [{"key": k, "text": v} for k, v in llm_sections.items()]
     else:
         logger.warning("Worker: natal LLM failed, using static fallback | user_id=%s | job_id=%s", user_id, job_id)
-        try:
-            static_sections: list[dict] = json.loads(static_sections_json)
-        except Exception:
-            static_sections = []
+        if static_sections is None:
+            static_sections = _load_legacy_fallback(static_sections_json)
         final_sections = static_sections
 
     result = {
@@ -122,12 +218,10 @@ async def task_generate_natal(
         "created_at": created_at,
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    await save_report_to_history(
-        redis=redis,
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="natal_basic",
         report_id=chart_id,
@@ -152,7 +246,8 @@ async def task_generate_stories(
     focus: str,
     natal_summary: str,
     key_aspects: list[str],
-    fallback_slides_json: str,  # pre-built static fallback
+    fallback_slides: list[dict] | None = None,  # pre-built static fallback
+    fallback_slides_json: str | None = None,  # legacy name, still sent by jobs queued before the list kwarg
     llm_provider_label: str | None,
     mbti_type: str | None = None,
 ) -> dict[str, Any]:
@@ -179,10 +274,9 @@ async def task_generate_stories(
         provider = llm_provider_label
     else:
         logger.warning("Worker: stories LLM failed, using static fallback | user_id=%s | job_id=%s", user_id, job_id)
-        try:
-            slides = json.loads(fallback_slides_json)
-        except Exception:
-            slides = []
+        if fallback_slides is None:
+            fallback_slides = _load_legacy_fallback(fallback_slides_json)
+        slides = fallback_slides
         provider = "local:fallback"
 
     result = {
@@ -191,9 +285,7 @@ async def task_generate_stories(
         "llm_provider": provider,
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
+    await _store_task_result(redis, job_id, result)
     logger.info("Worker: task_generate_stories done | user_id=%s | job_id=%s", user_id, job_id)
     return result
 
@@ -293,9 +385,7 @@ async def task_generate_numerology(
         "interpretations": interpretations,
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
+    await _store_task_result(redis, job_id, result)
     logger.info(
         "Worker: task_generate_numerology done | user_id=%s | job_id=%s",
         user_id,
@@ -337,20 +427,14 @@ async def task_generate_numerology_premium(
         )
     except Exception as exc:
         logger.error("Worker: task_generate_numerology_premium exception | user_id=%s | job_id=%s | err=%s", user_id, job_id, exc)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": "Внутренняя ошибка при генерации отчёта"}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _INTERNAL_ERROR_PAYLOAD)
         raise
 
     if report:
         logger.info("Worker: numerology premium LLM success | user_id=%s | job_id=%s", user_id, job_id)
     else:
         logger.error("Worker: numerology premium LLM failed | user_id=%s | job_id=%s", user_id, job_id)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": PREMIUM_LLM_FAILURE_MESSAGE}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _PREMIUM_LLM_FAILURE_PAYLOAD)
         return {"type": "numerology_premium", "numbers": {}, "report": None}
 
     result = {
@@ -366,19 +450,11 @@ async def task_generate_numerology_premium(
         "report": report,  # None if LLM failed
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    report_preview = ""
-    if isinstance(report, dict):
-        for key in ("core_essence", "life_purpose", "strengths"):
-            val = report.get(key)
-            if isinstance(val, str) and val.strip():
-                report_preview = val.strip()[:120]
-                break
-    await save_report_to_history(
-        redis=redis,
+    report_preview = _report_preview(report, _NUMEROLOGY_PREVIEW_KEYS)
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="numerology_premium",
         report_id=f"{tg_user_id}_{birth_date}",
@@ -452,10 +528,7 @@ async def task_generate_natal_premium(
         logger.info("Worker: natal premium LLM success | user_id=%s | job_id=%s", user_id, job_id)
     else:
         logger.error("Worker: natal premium LLM failed | user_id=%s | job_id=%s", user_id, job_id)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": PREMIUM_LLM_FAILURE_MESSAGE}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _PREMIUM_LLM_FAILURE_PAYLOAD)
         return {
             "type": "natal_premium",
             "sun_sign": sun_sign,
@@ -476,19 +549,11 @@ async def task_generate_natal_premium(
         "created_at": created_at,
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    report_preview = ""
-    if isinstance(report, dict):
-        for key in ("core_essence", "life_mission", "strengths"):
-            val = report.get(key)
-            if isinstance(val, str) and val.strip():
-                report_preview = val.strip()[:120]
-                break
-    await save_report_to_history(
-        redis=redis,
+    report_preview = _report_preview(report, _NATAL_PREVIEW_KEYS)
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="natal_premium",
         report_id=chart_id,
@@ -526,10 +591,7 @@ async def task_generate_tarot_premium(
         logger.info("Worker: tarot premium LLM success | user_id=%s | job_id=%s", user_id, job_id)
     else:
         logger.error("Worker: tarot premium LLM failed | user_id=%s | job_id=%s", user_id, job_id)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": PREMIUM_LLM_FAILURE_MESSAGE}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _PREMIUM_LLM_FAILURE_PAYLOAD)
         return {
             "type": "tarot_premium",
             "question": question,
@@ -547,23 +609,15 @@ async def task_generate_tarot_premium(
         "report": report,  # None if LLM failed
         "created_at": created_at,
     }
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    report_preview = ""
-    if isinstance(report, dict):
-        for key in ("synthesis", "overall_energy", "advice"):
-            val = report.get(key)
-            if isinstance(val, str) and val.strip():
-                report_preview = val.strip()[:120]
-                break
+    report_preview = _report_preview(report, _TAROT_PREVIEW_KEYS)
     cards_summary = [
         {"card_name": c.get("card_name", ""), "is_reversed": c.get("is_reversed", False), "slot_label": c.get("slot_label", "")}
         for c in (cards or [])
     ]
-    await save_report_to_history(
-        redis=redis,
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="tarot_premium",
         report_id=session_id,
@@ -630,12 +684,10 @@ async def task_generate_compat_free(
         "status": "done",
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    await save_report_to_history(
-        redis=redis,
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="compat_free",
         report_id=f"{tg_user_id}_{sign_1}_{sign_2}",
@@ -674,18 +726,12 @@ async def task_generate_compat_premium(
         )
     except Exception as exc:
         logger.error("Worker: task_generate_compat_premium exception | user_id=%s | job_id=%s | err=%s", user_id, job_id, exc)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": "Внутренняя ошибка при генерации отчёта"}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _INTERNAL_ERROR_PAYLOAD)
         raise
 
     if not report:
         logger.error("Worker: compat premium LLM failed | user_id=%s | job_id=%s", user_id, job_id)
-        task_key = f"arq_task:{job_id}"
-        task_payload = json.dumps({"status": "failed", "error": PREMIUM_LLM_FAILURE_MESSAGE}, ensure_ascii=False)
-        await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-        _restore_premium_claim(job_id, user_id)
+        await _fail_premium_task(redis, job_id, user_id, _PREMIUM_LLM_FAILURE_PAYLOAD)
         return {"type": "compat_premium", "report": None}
 
     result = {
@@ -697,12 +743,10 @@ async def task_generate_compat_premium(
         "status": "done",
     }
 
-    task_key = f"arq_task:{job_id}"
-    task_payload = json.dumps({"status": "done", "result": result}, ensure_ascii=False)
-    await redis.setex(task_key, ARQ_TASK_TTL, task_payload)
-
-    await save_report_to_history(
-        redis=redis,
+    await _store_task_result_and_history(
+        redis,
+        job_id,
+        result,
         tg_user_id=tg_user_id,
         report_type="compat_premium",
         report_id=f"{tg_user_id}_{sign_1}_{sign_2}_premium",
@@ -735,3 +779,23 @@ class WorkerSettings:
     on_shutdown = on_worker_shutdown
     max_tries = 1  # LLM calls are expensive; don't retry automatically
     job_timeout = 300
+
+
+def main() -> None:
+    """Run the ARQ worker on a uvloop event loop (``python -m app.worker``).
+
+    arq's Worker calls asyncio.get_event_loop() in its constructor, so the loop has
+    to be current before the worker is created; it is closed once the worker exits.
+    """
+    logging.config.dictConfig(default_log_config(verbose=False))
+    loop = uvloop.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        run_worker(WorkerSettings)
+    finally:
+        asyncio.set_event_loop(None)
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,9 @@
+from datetime import date, time
+from unittest.mock import patch
+
+from app import models, services
+
+
 def test_natal_forecast_tarot_flow(client):
     profile_resp = client.post(
         "/v1/natal/profile",
@@ -114,3 +120,70 @@ def test_delete_profile_resets_user_data(client):
     assert client.get("/v1/natal/profile/latest", headers=headers).status_code == 404
     assert client.get("/v1/natal/full", headers=headers).status_code == 404
     assert client.get("/v1/forecast/daily", headers=headers).status_code == 404
+
+
+class _DictRedis:
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def setex(self, key, ttl, value):
+        self.values[key] = value
+
+    def delete(self, key):
+        self.values.pop(key, None)
+
+
+def test_latest_birth_profile_cache_is_filled_only_on_write(db_session):
+    user = models.User(tg_user_id=402)
+    db_session.add(user)
+    db_session.commit()
+    redis_client = _DictRedis()
+
+    with patch("app.services._get_redis_client", return_value=redis_client):
+        profile = services.create_birth_profile(
+            db_session,
+            user_id=user.id,
+            birth_date=date(1996, 6, 11),
+            birth_time=time(8, 30),
+            birth_place="Moscow",
+            latitude=55.7558,
+            longitude=37.6173,
+            timezone_name="Europe/Moscow",
+        )
+        cached = services.get_latest_birth_profile_snapshot(db_session, user_id=user.id)
+        assert isinstance(cached, services.BirthProfileSnapshot)
+        assert cached.id == profile.id
+        assert cached.birth_time == time(8, 30)
+
+        redis_client.values.clear()
+        fresh = services.get_latest_birth_profile_snapshot(db_session, user_id=user.id)
+        assert fresh == cached
+        assert redis_client.values == {}
+
+
+def test_daily_forecast_generic_insert_path(db_session):
+    user = models.User(tg_user_id=403)
+    db_session.add(user)
+    db_session.commit()
+    profile = services.create_birth_profile(
+        db_session,
+        user_id=user.id,
+        birth_date=date(1990, 1, 15),
+        birth_time=time(12, 0),
+        birth_place="Moscow",
+        latitude=55.7558,
+        longitude=37.6173,
+        timezone_name="Europe/Moscow",
+    )
+    services.calculate_and_store_natal_chart(db_session, user_id=user.id, profile_id=profile.id)
+
+    with patch("app.services.supports_on_conflict_inserts", return_value=False):
+        first = services.get_or_create_daily_forecast(db_session, user_id=user.id, forecast_date=date(2026, 1, 1))
+        again = services.get_or_create_daily_forecast(db_session, user_id=user.id, forecast_date=date(2026, 1, 1))
+
+    assert again.id == first.id
+    assert 0 < first.energy_score <= 100
+    assert db_session.query(models.DailyForecast).filter(models.DailyForecast.user_id == user.id).count() == 1
@@ -1,11 +1,14 @@
 """Security tests: auth bypass, IDOR, idempotency."""
+from datetime import date, time
+
 import pytest
 from fastapi.testclient import TestClient
 
 # conftest.py already sets ALLOW_INSECURE_DEV_AUTH=true and imports the app.
 # We import settings here to patch it directly (lru_cache means env changes won't work).
+from app import models, services
 from app.config import settings
-from app.database import Base, engine
+from app.database import Base, engine, insert_ignoring_conflicts
 from app.main import app
 
 
@@ -142,3 +145,35 @@ class TestRaceCondition:
         # All calls must return the same energy_score (idempotent — no new rows each time)
         scores = [r.json()["energy_score"] for r in results]
         assert len(set(scores)) == 1, f"Expected identical scores, got: {scores}"
+
+    def test_conflicting_daily_forecast_insert_keeps_single_row(self, db_session):
+        """A losing concurrent INSERT hits ON CONFLICT DO NOTHING instead of raising."""
+        user = models.User(tg_user_id=200002)
+        db_session.add(user)
+        db_session.commit()
+        profile = services.create_birth_profile(
+            db_session,
+            user_id=user.id,
+            birth_date=date(1985, 3, 20),
+            birth_time=time(8, 30),
+            birth_place="Saint Petersburg",
+            latitude=59.9343,
+            longitude=30.3351,
+            timezone_name="Europe/Moscow",
+        )
+        services.calculate_and_store_natal_chart(db_session, user_id=user.id, profile_id=profile.id)
+
+        forecast_date = date(2024, 1, 1)
+        first = services.get_or_create_daily_forecast(db_session, user.id, forecast_date)
+
+        stmt = (
+            insert_ignoring_conflicts(db_session, models.DailyForecast, ("user_id", "forecast_date"))
+            .values(user_id=user.id, forecast_date=forecast_date, energy_score=1, summary="dup", payload={})
+            .returning(models.DailyForecast)
+        )
+        assert db_session.scalars(stmt).one_or_none() is None
+        db_session.commit()
+
+        rows = db_session.query(models.DailyForecast).filter(models.DailyForecast.user_id == user.id).all()
+        assert [row.id for row in rows] == [first.id]
+        assert rows[0].energy_score == first.energy_score
@@ -0,0 +1,117 @@
+"""Tests for Telegram Stars payment bookkeeping in app.star_payments."""
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from fastapi import HTTPException
+
+from app import models, star_payments
+
+
+def _make_user(db, tg_user_id: int) -> models.User:
+    user = models.User(tg_user_id=tg_user_id)
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def test_create_invoice_inserts_single_invoiced_row(db_session):
+    user = _make_user(db_session, 700001)
+    with patch(
+        "app.star_payments._create_telegram_invoice_link",
+        new=AsyncMock(return_value="https://t.me/$invoice"),
+    ):
+        payment = asyncio.run(star_payments.create_invoice_for_user(db_session, user=user, feature="natal_premium"))
+
+    rows = db_session.query(models.StarPayment).filter(models.StarPayment.user_id == user.id).all()
+    assert [row.id for row in rows] == [payment.id]
+    assert payment.status == star_payments.PAYMENT_STATUS_INVOICED
+    assert payment.invoice_link == "https://t.me/$invoice"
+    assert payment.amount_stars == star_payments.get_product("natal_premium").amount_stars
+
+
+def test_create_invoice_records_failed_row_when_telegram_rejects(db_session):
+    user = _make_user(db_session, 700002)
+    with patch(
+        "app.star_payments._create_telegram_invoice_link",
+        new=AsyncMock(side_effect=HTTPException(status_code=502, detail="down")),
+    ):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(star_payments.create_invoice_for_user(db_session, user=user, feature="tarot_premium"))
+
+    assert exc_info.value.status_code == 502
+    rows = db_session.query(models.StarPayment).filter(models.StarPayment.user_id == user.id).all()
+    assert len(rows) == 1
+    assert rows[0].status == star_payments.PAYMENT_STATUS_FAILED
+    assert rows[0].invoice_link is None
+
+
+def test_create_invoice_reuses_payment_for_same_idempotency_key(db_session):
+    user = _make_user(db_session, 700003)
+    telegram = AsyncMock(return_value="https://t.me/$invoice")
+    with patch("app.star_payments._create_telegram_invoice_link", new=telegram):
+        first = asyncio.run(
+            star_payments.create_invoice_for_user(db_session, user=user, feature="natal_premium", idempotency_key="k1")
+        )
+        again = asyncio.run(
+            star_payments.create_invoice_for_user(db_session, user=user, feature="natal_premium", idempotency_key="k1")
+        )
+        other = asyncio.run(
+            star_payments.create_invoice_for_user(db_session, user=user, feature="natal_premium", idempotency_key="k2")
+        )
+
+    assert again.id == first.id
+    assert other.id != first.id
+    assert telegram.await_count == 2
+
+
+def test_paid_payment_cannot_be_consumed_twice(db_session):
+    user = _make_user(db_session, 700004)
+    payment = models.StarPayment(
+        user_id=user.id,
+        tg_user_id=user.tg_user_id,
+        feature="tarot_premium",
+        amount_stars=star_payments.get_product("tarot_premium").amount_stars,
+        currency=star_payments.STARS_CURRENCY,
+        status=star_payments.PAYMENT_STATUS_PAID,
+        invoice_payload="stars:tarot_premium:700004:double-consume",
+    )
+    db_session.add(payment)
+    db_session.commit()
+    payment_id = payment.id
+
+    claimed = star_payments.claim_paid_payment_for_feature(
+        db_session, user=user, feature="tarot_premium", payment_id=payment_id
+    )
+    assert claimed.status == star_payments.PAYMENT_STATUS_CONSUMED
+
+    with pytest.raises(HTTPException) as exc_info:
+        star_payments.claim_paid_payment_for_feature(
+            db_session, user=user, feature="tarot_premium", payment_id=payment_id
+        )
+    assert exc_info.value.status_code == 409
+    assert exc_info.value.detail == "Платёж уже использован"
+
+
+def test_wallet_topup_credit_is_idempotent_without_on_conflict(db_session):
+    user = _make_user(db_session, 700005)
+    payment = models.StarPayment(
+        user_id=user.id,
+        tg_user_id=user.tg_user_id,
+        feature="wallet_topup_49",
+        amount_stars=star_payments.get_product("wallet_topup_49").amount_stars,
+        currency=star_payments.STARS_CURRENCY,
+        status=star_payments.PAYMENT_STATUS_PAID,
+        invoice_payload="stars:wallet_topup_49:700005:generic-insert",
+    )
+    db_session.add(payment)
+    db_session.commit()
+
+    with patch("app.star_payments.supports_on_conflict_inserts", return_value=False):
+        for _ in range(2):
+            star_payments._credit_wallet_for_paid_topup_if_needed(db_session, payment=payment)
+            db_session.commit()
+
+    assert star_payments.get_wallet_balance(db_session, user=user) == payment.amount_stars
+    assert len(star_payments.list_wallet_ledger_entries(db_session, user=user)) == 1
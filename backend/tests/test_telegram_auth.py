@@ -36,6 +36,21 @@ def test_verify_init_data_invalid_hash():
     assert result.ok is False
 
 
+def test_verify_init_data_rejects_reencoded_hash():
+    bot_token = "123456:ABCDEF_TOKEN"
+    payload = {"auth_date": str(int(time.time())), "query_id": "AAEAAAE"}
+
+    data_check_string = "\n".join(f"{k}={v}" for k, v in sorted(payload.items()))
+    secret_key = hmac.new(b"WebAppData", bot_token.encode("utf-8"), hashlib.sha256).digest()
+    payload_hash = hmac.new(secret_key, data_check_string.encode("utf-8"), hashlib.sha256).hexdigest()
+
+    assert verify_init_data(urlencode({**payload, "hash": payload_hash}), bot_token, 120).ok is True
+    for variant in (payload_hash.upper(), " ".join(payload_hash[i:i + 2] for i in range(0, 64, 2))):
+        result = verify_init_data(urlencode({**payload, "hash": variant}), bot_token, 120)
+        assert result.ok is False
+        assert result.reason == "Hash mismatch"
+
+
 def test_internal_api_key_auth(client):
     original_require = settings.require_telegram_init_data
     original_key = settings.internal_api_key
@@ -0,0 +1,222 @@
+"""Tests for how ARQ worker tasks publish results to Redis."""
+import asyncio
+import json
+import logging
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app import worker
+
+
+class _FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return None
+
+    def setex(self, key, ttl, value):
+        self.commands.append(("setex", key, ttl, value))
+        return self
+
+    def zadd(self, key, mapping):
+        self.commands.append(("zadd", key, mapping))
+        return self
+
+    def expire(self, key, ttl):
+        self.commands.append(("expire", key, ttl))
+        return self
+
+    async def execute(self, raise_on_error=True):
+        self.redis.round_trips += 1
+        results = []
+        for command in self.commands:
+            error = self.redis.errors.get((command[0], command[1]))
+            if error is None and command[0] == "setex":
+                self.redis.values[command[1]] = command[3]
+            results.append(error if error is not None else True)
+        return results
+
+
+class _FakeRedis:
+    def __init__(self, errors=None):
+        self.errors = errors or {}
+        self.values = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+    async def setex(self, key, ttl, value):
+        self.round_trips += 1
+        self.values[key] = value
+
+
+def _store(redis, summary=None):
+    asyncio.run(
+        worker._store_task_result_and_history(
+            redis,
+            "job-1",
+            {"answer": "да"},
+            tg_user_id=42,
+            report_type="natal_premium",
+            report_id="chart-1",
+            is_premium=True,
+            summary=summary if summary is not None else {"sun_sign": "Aries"},
+        )
+    )
+
+
+def test_result_and_history_share_one_round_trip():
+    redis = _FakeRedis()
+    _store(redis)
+
+    assert redis.round_trips == 1
+    assert json.loads(redis.values["arq_task:job-1"]) == {"status": "done", "result": {"answer": "да"}}
+    history = json.loads(redis.values["user_report:42:natal_premium:chart-1"])
+    assert history["summary"] == {"sun_sign": "Aries"}
+
+
+def test_task_key_write_failure_is_raised():
+    redis = _FakeRedis(errors={("setex", "arq_task:job-1"): ConnectionError("down")})
+    with pytest.raises(ConnectionError):
+        _store(redis)
+
+
+def test_history_write_failure_is_logged_and_result_kept(caplog):
+    redis = _FakeRedis(errors={("zadd", "user_history:42"): RuntimeError("OOM")})
+    with caplog.at_level(logging.ERROR, logger="astrobot.worker"):
+        _store(redis)
+
+    assert "arq_task:job-1" in redis.values
+    assert "Failed to save report to history" in caplog.text
+
+
+def test_unserializable_history_summary_still_publishes_result(caplog):
+    redis = _FakeRedis()
+    with caplog.at_level(logging.ERROR, logger="astrobot.worker"):
+        _store(redis, summary={"bad": object()})
+
+    assert json.loads(redis.values["arq_task:job-1"])["status"] == "done"
+    assert not any(key.startswith("user_report:") for key in redis.values)
+    assert "Failed to save report to history" in caplog.text
+
+
+_NATAL_KWARGS = {
+    "user_id": 1,
+    "tg_user_id": 42,
+    "chart_id": "chart-1",
+    "profile_id": "profile-1",
+    "sun_sign": "Aries",
+    "moon_sign": "Leo",
+    "rising_sign": "Virgo",
+    "wheel_chart_url": None,
+    "created_at": "2026-01-01T00:00:00+00:00",
+    "natal_summary": "",
+    "key_aspects": [],
+    "planetary_profile": [],
+    "house_cusps": [],
+    "planets_in_houses": [],
+    "mc_line": "",
+    "nodes_line": "",
+    "house_rulers": [],
+    "dispositors": [],
+    "essential_dignities": [],
+    "configurations": [],
+    "full_aspects": [],
+}
+
+_STORIES_KWARGS = {
+    "user_id": 1,
+    "forecast_date": "2026-01-01",
+    "energy_score": 70,
+    "sun_sign": "Aries",
+    "moon_sign": "Leo",
+    "rising_sign": "Virgo",
+    "mood": "баланс",
+    "focus": "приоритетах",
+    "natal_summary": "",
+    "key_aspects": [],
+    "llm_provider_label": "openrouter",
+}
+
+_FALLBACK = [{"key": "overview", "text": "Статичный текст"}]
+
+
+@pytest.mark.parametrize(
+    "fallback_kwargs",
+    [{"static_sections": _FALLBACK}, {"static_sections_json": json.dumps(_FALLBACK)}],
+)
+def test_natal_task_uses_static_fallback_when_llm_fails(fallback_kwargs):
+    redis = _FakeRedis()
+    with patch("app.worker.interpret_natal_sections_async", new=AsyncMock(return_value=None)):
+        result = asyncio.run(
+            worker.task_generate_natal({"job_id": "job-1", "redis": redis}, **_NATAL_KWARGS, **fallback_kwargs)
+        )
+
+    assert result["interpretation_sections"] == _FALLBACK
+    assert json.loads(redis.values["arq_task:job-1"]) == {"status": "done", "result": result}
+
+
+@pytest.mark.parametrize(
+    "fallback_kwargs",
+    [{"fallback_slides": _FALLBACK}, {"fallback_slides_json": json.dumps(_FALLBACK)}],
+)
+def test_stories_task_uses_static_fallback_when_llm_fails(fallback_kwargs):
+    redis = _FakeRedis()
+    with patch("app.worker.interpret_forecast_stories_async", new=AsyncMock(return_value=None)):
+        result = asyncio.run(
+            worker.task_generate_stories({"job_id": "job-1", "redis": redis}, **_STORIES_KWARGS, **fallback_kwargs)
+        )
+
+    assert result["slides"] == _FALLBACK
+    assert result["llm_provider"] == "local:fallback"
+    assert json.loads(redis.values["arq_task:job-1"])["result"] == result
+
+
+def test_premium_task_failure_publishes_error_and_restores_claim():
+    redis = _FakeRedis()
+    with (
+        patch("app.worker.interpret_natal_premium_async", new=AsyncMock(return_value=None)),
+        patch("app.worker._restore_premium_claim_sync") as restore,
+    ):
+        result = asyncio.run(worker.task_generate_natal_premium({"job_id": "job-1", "redis": redis}, **_NATAL_KWARGS))
+
+    assert result["report"] is None
+    assert json.loads(redis.values["arq_task:job-1"]) == {
+        "status": "failed",
+        "error": worker.PREMIUM_LLM_FAILURE_MESSAGE,
+    }
+    restore.assert_called_once_with("job-1", 1)
+
+
+def test_premium_task_exception_publishes_error_restores_claim_and_reraises():
+    redis = _FakeRedis()
+    with (
+        patch("app.worker.interpret_compat_premium_async", new=AsyncMock(side_effect=RuntimeError("boom"))),
+        patch("app.worker._restore_premium_claim_sync") as restore,
+    ):
+        with pytest.raises(RuntimeError):
+            asyncio.run(
+                worker.task_generate_compat_premium(
+                    {"job_id": "job-1", "redis": redis},
+                    user_id=1,
+                    tg_user_id=42,
+                    compat_type="romantic",
+                    sign_1="Aries",
+                    sign_2="Leo",
+                    name_1=None,
+                    name_2=None,
+                )
+            )
+
+    assert json.loads(redis.values["arq_task:job-1"]) == {
+        "status": "failed",
+        "error": "Внутренняя ошибка при генерации отчёта",
+    }
+    restore.assert_called_once_with("job-1", 1)